@@ -0,0 +1,19 @@
+from fastapi.requests import HTTPConnection
+from services.cache_warmer import CacheWarmer
+from services.image_service import ImageService
+from services.product_service import ProductService
+
+
+def get_product_service(connection: HTTPConnection) -> ProductService:
+    """Return the ProductService created in the application lifespan"""
+    return connection.app.state.product_service
+
+
+def get_cache_warmer(connection: HTTPConnection) -> CacheWarmer:
+    """Return the CacheWarmer started in the application lifespan"""
+    return connection.app.state.cache_warmer
+
+
+def get_image_service(connection: HTTPConnection) -> ImageService:
+    """Return the ImageService created in the application lifespan"""
+    return connection.app.state.image_service
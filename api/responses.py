@@ -0,0 +1,65 @@
+import os
+from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response
+from starlette.types import Receive, Scope, Send
+from services import json_codec
+
+# Default response class of the app: orjson-backed when orjson is installed
+FastJSONResponse = ORJSONResponse if json_codec.orjson is not None else JSONResponse
+
+
+class RawJSONResponse(Response):
+    """
+    Response for a body that is already serialized JSON
+
+    Routes returning it keep their response_model for the OpenAPI schema,
+    while FastAPI skips validating and encoding the content a second time.
+    """
+
+    media_type = "application/json"
+
+
+class TemporaryFileResponse(FileResponse):
+    """
+    FileResponse for a file that is deleted once the response has ended
+
+    The file is deleted however the response ends, also when the client
+    disconnects in the middle of it.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Tell whether an If-None-Match header matches an ETag
+
+    Uses the weak comparison that RFC 9110 prescribes for If-None-Match, so
+    a W/ prefix sent back by an intermediary still matches.
+
+    Args:
+        if_none_match (Optional[str]): Header value, a list of entity tags or "*"
+        etag (str): Quoted entity tag of the current representation
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
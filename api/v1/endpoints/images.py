@@ -0,0 +1,64 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, Response
+from api.deps import get_image_service
+from api.responses import TemporaryFileResponse, etag_matches
+from config import get_settings
+from services.image_service import ImageService
+
+settings = get_settings()
+
+router = APIRouter()
+
+# Stored images never change under their ETag
+_CACHE_CONTROL = f"public, max-age={settings.IMAGE_HTTP_MAX_AGE}, immutable"
+
+@router.get(
+    "",
+    response_class=TemporaryFileResponse,
+    responses={
+        200: {"content": {"image/*": {}}, "description": "The image"},
+        304: {"description": "The client's copy, identified by If-None-Match, is current"},
+    },
+    summary="Get a product image through the image cache",
+)
+async def read_image(
+    url: str = Query(..., description="OpenFood image URL"),
+    width: Optional[int] = Query(None, description="Width of a reduced-size variant"),
+    if_none_match: Optional[str] = Header(None),
+    image_service: ImageService = Depends(get_image_service),
+):
+    """
+    Retrieve a product image, fetched once from OpenFood and then served from
+    the on-disk image store.
+
+    Only images on IMAGE_ALLOWED_HOSTS are proxied, and variants are limited
+    to IMAGE_VARIANT_WIDTHS. The file is sent by FileResponse, through a
+    private hard link so that evicting the image meanwhile cannot cut the
+    response short, with an ETag; a matching If-None-Match gets an empty 304
+    response.
+
+    Args:
+        url (str): Image URL on an allowed host
+        width (Optional[int]): Width of a reduced-size variant
+        if_none_match (Optional[str]): ETags of the copies the client holds
+        image_service (ImageService): Shared image fetching and storage service
+
+    Returns:
+        TemporaryFileResponse: The image file
+
+    Raises:
+        HTTPException: If the URL or width is not allowed, or the image cannot be fetched
+    """
+    image = await image_service.get_image(url, width)
+    if etag_matches(if_none_match, image.etag):
+        headers = {"ETag": image.etag, "Cache-Control": _CACHE_CONTROL}
+        return Response(status_code=304, headers=headers)
+
+    image, path = await image_service.link_image(url, width, image)
+    headers = {"ETag": image.etag, "Cache-Control": _CACHE_CONTROL}
+    return TemporaryFileResponse(
+        path,
+        media_type=image.content_type,
+        headers=headers,
+        stat_result=image.stat,
+    )
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from api.deps import get_product_service
+from services import metrics
+from services.product_service import ProductService
+
+router = APIRouter()
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("", summary="Get metrics in the Prometheus text format", response_class=PlainTextResponse)
+async def read_metrics(product_service: ProductService = Depends(get_product_service)):
+    """
+    Return stage and request latency histograms, upstream status codes,
+    in-flight counts and the cache and upstream counters of the lookup pipeline.
+
+    Returns:
+        PlainTextResponse: Metrics in the Prometheus text exposition format
+    """
+    body = metrics.REGISTRY.render(metrics.pipeline_metrics(product_service.stats()))
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
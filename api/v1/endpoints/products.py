@@ -1,19 +1,220 @@
-from fastapi import APIRouter, HTTPException
-from models.product import Product
-from models.product_analysis import ProductAnalysis
+import asyncio
+import logging
+from typing import List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from api.deps import get_product_service
+from api.responses import RawJSONResponse, etag_matches
+from config import get_settings
+from models.alternatives import AlternativesResponse
+from models.batch import BatchItem, BatchRequest, BatchResponse
 from models.product_response import ProductResponse
-from services.openfood_service import OpenFoodService
-from services.product_analysis_service import ProductAnalysisService
+from services import json_codec
+from services.barcode import canonical_or_raw
+from services.product_service import AnalyzedProduct, ProductService
+from services.upstream_scheduler import Priority
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/{barcode}", response_model=ProductResponse, summary="Get product information and analysis")
-async def read_product(barcode: str):
+# Clients may reuse a product response for max-age seconds, then keep showing
+# it while revalidating with If-None-Match
+_CACHE_CONTROL = (
+    f"public, max-age={settings.PRODUCT_HTTP_MAX_AGE}, "
+    f"stale-while-revalidate={settings.PRODUCT_HTTP_STALE_WHILE_REVALIDATE}"
+)
+
+def _validator_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+
+def _serialize_item(barcode: str, outcome: Union[AnalyzedProduct, HTTPException]) -> bytes:
+    """
+    Serialize a BatchItem, splicing in the cached JSON body of the product
+
+    Produces the same document as BatchItem(...).model_dump_json() without
+    validating or encoding the product response again.
+    """
+    if isinstance(outcome, HTTPException):
+        item = BatchItem(barcode=barcode, status_code=outcome.status_code, error=outcome.detail)
+        return item.model_dump_json().encode("utf-8")
+    return (
+        b'{"barcode":' + json_codec.dumps(barcode) +
+        b',"status_code":200,"result":' + outcome.body + b',"error":null}'
+    )
+
+def _serialize_batch(results: List[Tuple[str, Union[AnalyzedProduct, HTTPException]]]) -> bytes:
+    """Serialize a BatchResponse the same way, item by item"""
+    items = [_serialize_item(barcode, outcome) for barcode, outcome in results]
+    return b'{"results":[' + b",".join(items) + b"]}"
+
+@router.post("/batch", response_model=BatchResponse, summary="Get information and analysis for many products")
+async def read_products_batch(
+    request: BatchRequest,
+    product_service: ProductService = Depends(get_product_service),
+):
+    """
+    Retrieve product information and analysis for a list of barcodes.
+
+    Every requested barcode gets one item, in request order, under the
+    spelling it was requested with. Barcodes of the same product, in any
+    spelling, are looked up once and share the outcome. Lookups run
+    concurrently, at most BATCH_CONCURRENCY at a time, and a failed lookup
+    is reported in its own item instead of failing the whole batch. Upstream
+    calls are scheduled as background work, behind interactive scans.
+
+    Args:
+        request (BatchRequest): Barcodes to look up
+        product_service (ProductService): Shared product lookup and analysis service
+
+    Returns:
+        BatchResponse: Per-barcode results and errors
+    """
+    # Spellings of the same product share one lookup, made with the first
+    # one requested; invalid barcodes get their own lookup and error
+    keys = [canonical_or_raw(barcode) for barcode in request.barcodes]
+    distinct = {}
+    for key, barcode in zip(keys, request.barcodes):
+        distinct.setdefault(key, barcode)
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def lookup(barcode: str) -> Union[AnalyzedProduct, HTTPException]:
+        async with semaphore:
+            try:
+                return await product_service.get_product(barcode, Priority.BACKGROUND)
+            except HTTPException as e:
+                return e
+            except Exception:
+                logger.exception("Lookup of %s failed", barcode)
+                return HTTPException(status_code=500, detail="Internal server error")
+
+    outcomes = dict(zip(
+        distinct, await asyncio.gather(*(lookup(barcode) for barcode in distinct.values()))
+    ))
+    results = [(barcode, outcomes[key]) for key, barcode in zip(keys, request.barcodes)]
+    return RawJSONResponse(_serialize_batch(results))
+
+@router.websocket("/ws")
+async def scan_session(
+    websocket: WebSocket,
+    product_service: ProductService = Depends(get_product_service),
+):
+    """
+    Stream product lookups over one connection per scanning device.
+
+    Each text message is a barcode. Every barcode gets one reply, a BatchItem
+    JSON object with the product response or the error, sent as soon as its
+    lookup finishes, so replies may arrive out of order. A binary message gets
+    a 400 error item with an empty barcode. Lookups go through the same
+    cached pipeline as read_product, as interactive scans.
+
+    At most WS_SESSION_MAX_PENDING lookups run per session. Once that many
+    are pending, the server stops reading from the socket until one
+    finishes, so a slow upstream pushes back on the device instead of
+    queueing scans in memory.
+
+    Args:
+        websocket (WebSocket): Device connection
+        product_service (ProductService): Shared product lookup and analysis service
+    """
+    await websocket.accept()
+    pending = asyncio.Semaphore(settings.WS_SESSION_MAX_PENDING)
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def reply(barcode: str, outcome: Union[AnalyzedProduct, HTTPException]) -> None:
+        message = _serialize_item(barcode, outcome).decode("utf-8")
+        async with send_lock:
+            await websocket.send_text(message)
+
+    async def lookup(barcode: str) -> None:
+        try:
+            try:
+                outcome = await product_service.get_product(barcode)
+            except HTTPException as e:
+                outcome = e
+            except Exception:
+                logger.exception("Lookup of %s failed", barcode)
+                outcome = HTTPException(status_code=500, detail="Internal server error")
+            await reply(barcode, outcome)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            pending.release()
+
+    try:
+        while True:
+            await pending.acquire()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is None:
+                pending.release()
+                await reply("", HTTPException(status_code=400, detail="Barcodes must be sent as text frames"))
+                continue
+            task = asyncio.create_task(lookup(message["text"].strip()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@router.get(
+    "/{barcode}/alternatives",
+    response_model=AlternativesResponse,
+    summary="Get higher-rated alternatives to a product",
+)
+async def read_alternatives(
+    barcode: str,
+    limit: int = Query(5, ge=1, le=settings.ALTERNATIVES_MAX_RESULTS, description="Maximum number of alternatives"),
+    product_service: ProductService = Depends(get_product_service),
+):
+    """
+    Retrieve the best rated products that rate higher than a product in its categories.
+
+    Alternatives are looked up in an in-memory index of the products the
+    service has analyzed or read from its local store, without calling the
+    OpenFood API. The most specific category is searched first; broader ones
+    fill the remaining places.
+
+    Args:
+        barcode (str): Product barcode
+        limit (int): Maximum number of alternatives
+        product_service (ProductService): Shared product lookup and analysis service
+
+    Returns:
+        AlternativesResponse: Product rating and its alternatives
+
+    Raises:
+        HTTPException: If the barcode is invalid or the product is not known locally
+    """
+    return await product_service.get_alternatives(barcode, limit)
+
+@router.get(
+    "/{barcode}",
+    response_model=ProductResponse,
+    responses={304: {"description": "The client's copy, identified by If-None-Match, is current"}},
+    summary="Get product information and analysis",
+)
+async def read_product(
+    barcode: str,
+    if_none_match: Optional[str] = Header(None),
+    product_service: ProductService = Depends(get_product_service),
+):
     """
     Retrieve product information and analysis by barcode from OpenFood database.
+
+    The response carries a strong ETag derived from the product revision and
+    the scoring rules version. A request whose If-None-Match matches it gets
+    an empty 304 response, before the product is analyzed or serialized.
     
     Args:
         barcode (str): Product barcode
+        if_none_match (Optional[str]): ETags of the copies the client holds
+        product_service (ProductService): Shared product lookup and analysis service
         
     Returns:
         ProductResponse: Product information and analysis
@@ -21,21 +222,12 @@ async def read_product(barcode: str):
     Raises:
         HTTPException: If product is not found or API request fails
     """
-    openfood_data = await OpenFoodService.get_product(barcode)
-    product_data = openfood_data.get("product", {})
-    
-    product = Product(
-        barcode=product_data.get("_id", ""),
-        brand=product_data.get("brands", ""),
-        category=product_data.get("categories", ""),
-        country=product_data.get("countries", ""),
-        creator=product_data.get("creator", ""),
-        image=product_data.get("image_url", ""),
-        image_ingredients=product_data.get("image_ingredients_url", ""),
-        image_nutritions=product_data.get("image_nutrition_url", ""),
-        ingredients=product_data.get("ingredients_text", ""),
-    )
-    
-    analysis = ProductAnalysisService.analyze_product(openfood_data)
-    
-    return ProductResponse(product=product, analysis=analysis)
\ No newline at end of file
+    record = await product_service.get_product_record(barcode)
+    etag = product_service.etag(record)
+    if etag is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_validator_headers(etag))
+
+    analyzed = product_service.analyze(record)
+    if etag_matches(if_none_match, analyzed.etag):
+        return Response(status_code=304, headers=_validator_headers(analyzed.etag))
+    return RawJSONResponse(analyzed.body, headers=_validator_headers(analyzed.etag))
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from api.deps import get_cache_warmer, get_image_service, get_product_service
+from services.cache_warmer import CacheWarmer
+from services.image_service import ImageService
+from services.product_service import ProductService
+
+router = APIRouter()
+
+@router.get("", summary="Get runtime counters of the product lookup pipeline")
+async def read_stats(
+    product_service: ProductService = Depends(get_product_service),
+    cache_warmer: CacheWarmer = Depends(get_cache_warmer),
+    image_service: ImageService = Depends(get_image_service),
+):
+    """
+    Return cache usage and hit/miss/eviction counters of the lookup pipeline.
+
+    Returns:
+        dict: Counters grouped by component
+    """
+    return {
+        **product_service.stats(),
+        "cache_warmer": cache_warmer.stats(),
+        "images": image_service.stats(),
+    }
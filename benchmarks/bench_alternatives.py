@@ -0,0 +1,94 @@
+"""
+Measure alternatives lookups on a synthetic catalog derived from the recorded
+OpenFood payloads in fixtures/, and check them against a full scan.
+
+Usage (from the project root):
+    python -m benchmarks.bench_alternatives --products 100000
+"""
+import argparse
+import os
+import random
+import time
+
+from models.product_record import ProductRecord
+from services import json_codec
+from services.alternatives_index import AlternativesIndex
+from services.barcode import check_digit
+from services.product_analysis_service import ProductAnalysisService
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "products.jsonl")
+
+
+def catalog(count: int, seed: int = 0) -> list:
+    """Fixture products with distinct barcodes and random grades"""
+    with open(FIXTURES, "rb") as f:
+        products = [json_codec.loads(line)["product"] for line in f if line.strip()]
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        product = dict(rng.choice(products))
+        body = f"{200000000000 + i}"
+        product["_id"] = product["code"] = body + str(check_digit(body))
+        product["nutriscore_grade"] = rng.choice("abcde")
+        product["nova_group"] = rng.choice((1, 2, 3, 4))
+        product["ecoscore_grade"] = rng.choice("abcde")
+        product["additives_tags"] = rng.choice(([], ["en:e322"]))
+        records.append(ProductRecord.from_product(product))
+    return records
+
+
+def scan(records: list, scores: dict, record: ProductRecord, limit: int) -> list:
+    """Reference answer: every product of every category, most specific category first"""
+    found, seen = [], {record.barcode}
+    score = scores[record.barcode]
+    for category in reversed(record.categories):
+        better = sorted(
+            (-scores[other.barcode], other.barcode) for other in records
+            if category in other.categories and scores[other.barcode] > score
+        )
+        for _, barcode in better:
+            if barcode not in seen:
+                seen.add(barcode)
+                found.append(barcode)
+    return found[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--per-category", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = catalog(args.products)
+    rules = {record.barcode: ProductAnalysisService.rate_record(record) for record in records}
+    scores = {barcode: rule.score for barcode, rule in rules.items()}
+
+    index = AlternativesIndex(args.per_category)
+    started = time.perf_counter()
+    for record in records:
+        rule = rules[record.barcode]
+        index.add(record, rule.score, rule.health_rating)
+    build = time.perf_counter() - started
+
+    for record in records[:50]:
+        expected = scan(records, scores, record, args.limit)
+        actual = index.alternatives(record.barcode, record.categories, scores[record.barcode], args.limit)
+        if [product.barcode for product, _ in actual] != expected:
+            raise SystemExit(f"Alternatives mismatch for {record.barcode}")
+
+    sample = [records[i % len(records)] for i in range(args.lookups)]
+    started = time.perf_counter()
+    for record in sample:
+        index.alternatives(record.barcode, record.categories, scores[record.barcode], args.limit)
+    lookup = time.perf_counter() - started
+
+    print(f"products:      {len(records)} ({index.stats()['products']} listed "
+          f"in {index.stats()['categories']} categories)")
+    print(f"build:         {build * 1e6 / len(records):8.2f} us/product")
+    print(f"lookup:        {lookup * 1e6 / len(sample):8.2f} us (top {args.limit})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Reproducible load and latency benchmark of the real app against a local
+OpenFood stand-in.
+
+Starts benchmarks.fake_openfood and main:app as separate uvicorn processes,
+drives GET /api/v1/products/{barcode} at a fixed concurrency with a
+Zipf-distributed barcode mix, and writes throughput, latency percentiles,
+status codes, upstream call counts and the app's peak RSS to a JSON file.
+
+Usage (from the project root):
+    python -m benchmarks.bench_load --requests 20000 --concurrency 64 --output results.json
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ean13(body: str) -> str:
+    """Append the EAN-13 check digit to 12 digits"""
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def make_barcodes(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    barcodes = set()
+    while len(barcodes) < count:
+        barcodes.add(ean13("".join(rng.choice("0123456789") for _ in range(12))))
+    return sorted(barcodes)
+
+
+class ZipfSampler:
+    """Draw items with probability proportional to 1 / rank ** s"""
+
+    def __init__(self, items: List[str], s: float, seed: int):
+        self.items = items
+        self.rng = random.Random(seed)
+        total = 0.0
+        self.cumulative = []
+        for rank in range(1, len(items) + 1):
+            total += 1.0 / rank ** s
+            self.cumulative.append(total)
+
+    def sample(self) -> str:
+        point = self.rng.random() * self.cumulative[-1]
+        return self.items[bisect.bisect_left(self.cumulative, point)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    """Return the peak resident set size of a process in bytes (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not come up within {timeout}s")
+                await asyncio.sleep(0.1)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def drive(base_url: str, sampler: ZipfSampler, requests: int, concurrency: int) -> dict:
+    """Send ``requests`` lookups from ``concurrency`` workers and collect latencies"""
+    latencies: List[float] = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker() -> None:
+            for _ in remaining:
+                barcode = sampler.sample()
+                started = time.perf_counter()
+                try:
+                    response = await client.get(f"/api/v1/products/{barcode}")
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3),
+        },
+        "status_codes": dict(statuses),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+
+    fake = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fake_openfood", "--port", str(fake_port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--not-found-rate", str(args.not_found_rate),
+            "--seed", str(args.seed),
+        ],
+        cwd=ROOT,
+    )
+    env = dict(
+        os.environ,
+        OPENFOOD_API_URL=f"{fake_url}/api/v2/product/{{barcode}}.json",
+        # The stand-in has no rate limit; keep the scheduler out of the measurement
+        OPENFOOD_RATE_LIMIT_PER_MINUTE=str(args.upstream_rate_per_minute),
+        OPENFOOD_RATE_LIMIT_BURST=str(max(1, int(args.upstream_rate_per_minute / 60))),
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        await wait_until_up(f"{fake_url}/__stats")
+        await wait_until_up(f"{app_url}/")
+
+        barcodes = make_barcodes(args.barcodes, args.seed)
+        sampler = ZipfSampler(barcodes, args.zipf, args.seed)
+        if args.warmup:
+            await drive(app_url, sampler, args.warmup, args.concurrency)
+
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{fake_url}/__reset")
+            result = await drive(app_url, sampler, args.requests, args.concurrency)
+            upstream = (await client.get(f"{fake_url}/__stats")).json()
+
+        result["upstream_calls"] = upstream.get("product", 0)
+        result["upstream_errors"] = upstream.get("errors", 0)
+        result["upstream_calls_per_request"] = round(result["upstream_calls"] / result["requests"], 4)
+        result["peak_rss_bytes"] = peak_rss(app.pid)
+        return result
+    finally:
+        for process in (app, fake):
+            process.terminate()
+        for process in (app, fake):
+            process.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load and latency benchmark against a local OpenFood stand-in")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=0, help="Requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--barcodes", type=int, default=5_000, help="Distinct barcodes in the mix")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the barcode mix")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Upstream mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Upstream latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream 502s")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="Share of unknown barcodes")
+    parser.add_argument("--upstream-rate-per-minute", type=float, default=6_000_000,
+                        help="Rate limit configured in the app under test")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="Free-form name of this run")
+    parser.add_argument("--output", default="bench_output.json", help="JSON file to write")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "label")},
+        "results": result,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure the memory a cached product costs as the decoded OpenFood response, as
+the projected document and as a ProductRecord, on the recorded OpenFood payloads
+in fixtures/, and check that records produce the same responses.
+
+The fixtures are responses to requests limited to PRODUCT_FIELDS, like the
+service sends, so the decoded response is not the full upstream document;
+projecting it only trims the nutriments to NUTRIMENT_FIELDS.
+
+Usage (from the project root):
+    python -m benchmarks.bench_product_memory --products 20000
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+
+from models.product_record import ProductRecord
+from services import json_codec
+from services.openfood_fields import project_product
+from services.product_analysis_service import ProductAnalysisService
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "products.jsonl")
+
+
+def load_fixtures() -> list:
+    with open(FIXTURES, "rb") as f:
+        return [line for line in f if line.strip()]
+
+
+def distinct_payloads(lines: list, count: int) -> list:
+    """Encoded documents with distinct barcodes, decoded separately like upstream responses"""
+    payloads = []
+    for i in range(count):
+        document = json_codec.loads(lines[i % len(lines)])
+        barcode = f"{2000000000000 + i}"
+        document["code"] = document["product"]["_id"] = document["product"]["code"] = barcode
+        payloads.append(json_codec.dumps(document))
+    return payloads
+
+
+def measure(payloads: list, build) -> int:
+    """Return the bytes retained by holding build(document) for every payload"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(json_codec.loads(payload)) for payload in payloads]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del held
+    return retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=20_000)
+    args = parser.parse_args()
+
+    lines = load_fixtures()
+    for line in lines:
+        document = json_codec.loads(line)
+        expected = ProductAnalysisService.analyze_product(document)
+        actual = ProductAnalysisService.analyze_record(ProductRecord.from_product(document["product"]))
+        if actual != expected:
+            raise SystemExit(f"Analysis mismatch for {document['code']}")
+
+    payloads = distinct_payloads(lines, args.products)
+    # Warm up the interned tag strings so they are not counted per product
+    for payload in payloads[:len(lines)]:
+        ProductRecord.from_product(json_codec.loads(payload)["product"])
+
+    decoded = measure(payloads, lambda document: document)
+    projected = measure(payloads, lambda document: project_product(document["product"]))
+    records = measure(payloads, lambda document: ProductRecord.from_product(document["product"]))
+    estimate = sum(ProductRecord.from_product(json_codec.loads(p)["product"]).size() for p in payloads)
+
+    n = len(payloads)
+    print(f"products:            {n}")
+    print(f"decoded response:    {decoded / n:8.0f} bytes/product")
+    print(f"projected document:  {projected / n:8.0f} bytes/product")
+    print(f"ProductRecord:       {records / n:8.0f} bytes/product "
+          f"({projected / records:.1f}x smaller than projected, {decoded / records:.1f}x than decoded)")
+    print(f"ProductRecord.size(): {estimate / n:7.0f} bytes/product (estimate used by the cache)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Time the precomputed rating table against the reference scoring rules per
+product. Their equivalence is checked by tests/test_rating_table.py.
+
+Usage (from the project root):
+    python -m benchmarks.bench_rating_table --iterations 200000
+"""
+import argparse
+import timeit
+
+from services.product_analysis_service import ProductAnalysisService, _RATING_TABLE
+
+
+def reference(nutri_score, nova_group, eco_score, additives, product_name):
+    """Ratings as computed by the scoring rules before the table existed"""
+    score, details, description = ProductAnalysisService._calculate_product_rating(
+        nutri_score=nutri_score,
+        additives=additives,
+        nova_group=nova_group,
+        eco_score=eco_score,
+        product_name=product_name
+    )
+    health = ProductAnalysisService._determine_health_rating(nutri_score, 0, nova_group)
+    environmental = ProductAnalysisService._determine_environmental_rating(eco_score, 0)
+    return score, details, description, health, environmental
+
+
+def from_table(nutri_score, nova_group, eco_score, additives, product_name):
+    rule = _RATING_TABLE[ProductAnalysisService._rating_index(
+        nutri_score, nova_group, eco_score, bool(additives)
+    )]
+    description = rule.describe(product_name, len(additives))
+    return rule.score, rule.details, description, rule.health_rating, rule.environmental_rating
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    sample = ("c", 4, "d", ["en:e322", "en:e471"], "Pure Premium Orange Juice")
+    reference_seconds = timeit.timeit(lambda: reference(*sample), number=args.iterations)
+    table_seconds = timeit.timeit(lambda: from_table(*sample), number=args.iterations)
+    print(f"reference:    {reference_seconds / args.iterations * 1e6:.2f} us/product")
+    print(f"table:        {table_seconds / args.iterations * 1e6:.2f} us/product")
+    print(f"speedup:      {reference_seconds / table_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
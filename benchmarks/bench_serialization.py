@@ -0,0 +1,85 @@
+"""
+Measure the per-request cost of turning a product analysis into a response
+body, comparing FastAPI's response_model path with the pre-serialized path
+used by read_product, on the recorded OpenFood payloads in fixtures/.
+
+Usage (from the project root):
+    python -m benchmarks.bench_serialization --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from api.responses import RawJSONResponse
+from main import app
+from models.product_record import ProductRecord
+from services import json_codec
+from services.product_service import ProductService
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "products.jsonl")
+
+
+def load_fixtures() -> list:
+    with open(FIXTURES, "rb") as f:
+        return [json_codec.loads(line) for line in f if line.strip()]
+
+
+async def fastapi_path(field, response) -> bytes:
+    """What FastAPI does for a route returning a model with response_model set"""
+    content = await serialize_response(field=field, response_content=response)
+    return JSONResponse(content).body
+
+
+def raw_path(body: bytes) -> bytes:
+    return RawJSONResponse(body).body
+
+
+async def run(iterations: int) -> None:
+    route = next(route for route in app.routes if getattr(route, "name", None) == "read_product")
+    payloads = load_fixtures()
+    responses = [ProductService.build_response(ProductRecord.from_product(data["product"])) for data in payloads]
+    bodies = [response.model_dump_json().encode("utf-8") for response in responses]
+    rounds = max(1, iterations // len(payloads))
+    requests = rounds * len(payloads)
+
+    for response, body in zip(responses, bodies):
+        if json_codec.loads(await fastapi_path(route.response_field, response)) != json_codec.loads(body):
+            raise SystemExit(f"Body mismatch for {response.product.barcode}")
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for response in responses:
+            await fastapi_path(route.response_field, response)
+    before = (time.perf_counter() - started) / requests
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for response in responses:
+            raw_path(response.model_dump_json().encode("utf-8"))
+    after_miss = (time.perf_counter() - started) / requests
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for body in bodies:
+            raw_path(body)
+    after_hit = (time.perf_counter() - started) / requests
+
+    print(f"payloads:                     {len(payloads)} products, {requests} serializations")
+    print(f"response_model + JSONResponse: {before * 1e6:8.2f} us/request")
+    print(f"model_dump_json + raw body:    {after_miss * 1e6:8.2f} us/request ({before / after_miss:.1f}x)")
+    print(f"cached body (analysis hit):    {after_hit * 1e6:8.2f} us/request ({before / after_hit:.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Local stand-in for the OpenFood product API, for benchmarks.
+
+Serves the recorded products in fixtures/products.jsonl under any barcode
+(barcodes are mapped onto the fixtures deterministically), with configurable
+latency, jitter, error and not-found rates. GET /__stats returns the number of
+calls received and POST /__reset clears it.
+
+Usage (from the project root):
+    python -m benchmarks.fake_openfood --port 8100 --latency-ms 80 --jitter-ms 40
+    OPENFOOD_API_URL=http://127.0.0.1:8100/api/v2/product/{barcode}.json uvicorn main:app
+"""
+import argparse
+import asyncio
+import copy
+import os
+import random
+import zlib
+from collections import Counter
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from services import json_codec
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "products.jsonl")
+
+
+def load_fixtures() -> list:
+    with open(FIXTURES, "rb") as f:
+        return [json_codec.loads(line) for line in f if line.strip()]
+
+
+def create_app(
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    not_found_rate: float = 0.0,
+    seed: int = 0,
+) -> Starlette:
+    """
+    Build the fake OpenFood application
+
+    Args:
+        latency_ms (float): Mean response delay
+        jitter_ms (float): Uniform +/- variation of the delay
+        error_rate (float): Share of requests answered with 502
+        not_found_rate (float): Share of barcodes that are unknown (stable per barcode)
+        seed (int): Seed of the error and latency draws
+    """
+    fixtures = load_fixtures()
+    rng = random.Random(seed)
+    calls = Counter()
+
+    def body_for(barcode: str) -> bytes:
+        bucket = zlib.crc32(barcode.encode("utf-8"))
+        if bucket % 10_000 < not_found_rate * 10_000:
+            return json_codec.dumps({"code": barcode, "status": 0, "status_verbose": "product not found"})
+        document = copy.deepcopy(fixtures[bucket % len(fixtures)])
+        document["code"] = barcode
+        document["product"]["_id"] = barcode
+        document["product"]["code"] = barcode
+        return json_codec.dumps(document)
+
+    async def product(request: Request) -> Response:
+        calls["product"] += 1
+        delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if rng.random() < error_rate:
+            calls["errors"] += 1
+            return Response(status_code=502)
+        barcode = request.path_params["barcode"]
+        return Response(body_for(barcode), media_type="application/json")
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse(dict(calls))
+
+    async def reset(request: Request) -> Response:
+        calls.clear()
+        return JSONResponse({})
+
+    return Starlette(routes=[
+        Route("/api/v2/product/{barcode}.json", product),
+        Route("/__stats", stats),
+        Route("/__reset", reset, methods=["POST"]),
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenFood product API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.not_found_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
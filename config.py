@@ -1,10 +1,107 @@
+import os
+import tempfile
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Optional
 
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "iScan API"
     OPENFOOD_API_URL: str = "https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+
+    # Shared upstream HTTP client
+    OPENFOOD_MAX_CONNECTIONS: int = 100
+    OPENFOOD_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENFOOD_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    OPENFOOD_HTTP2: bool = False  # requires httpx[http2]
+    OPENFOOD_CONNECT_TIMEOUT: float = 3.0  # seconds
+    OPENFOOD_READ_TIMEOUT: float = 10.0  # seconds
+    OPENFOOD_WRITE_TIMEOUT: float = 10.0  # seconds
+    OPENFOOD_POOL_TIMEOUT: float = 5.0  # seconds
+    # Seconds a caller waits on a shared in-flight lookup; raised per class to cover its queue wait
+    OPENFOOD_WAIT_TIMEOUT: float = 15.0
+
+    # Upstream resilience: circuit breaker, retry budget and hedged requests
+    OPENFOOD_BREAKER_WINDOW: int = 50  # most recent calls considered
+    OPENFOOD_BREAKER_MIN_CALLS: int = 10
+    OPENFOOD_BREAKER_FAILURE_RATE: float = 0.5  # share of failed or slow calls that opens the breaker
+    OPENFOOD_BREAKER_SLOW_CALL: float = 2.0  # seconds after which a call counts as slow
+    OPENFOOD_BREAKER_OPEN_SECONDS: float = 30.0
+    OPENFOOD_BREAKER_HALF_OPEN_CALLS: int = 3
+    OPENFOOD_RETRY_MAX_ATTEMPTS: int = 3  # including the first attempt
+    OPENFOOD_RETRY_BUDGET_RATIO: float = 0.2  # retries allowed per request
+    OPENFOOD_RETRY_MIN_PER_SECOND: float = 1.0
+    OPENFOOD_RETRY_BACKOFF_BASE: float = 0.1  # seconds
+    OPENFOOD_RETRY_BACKOFF_MAX: float = 2.0  # seconds
+    OPENFOOD_HEDGE_ENABLED: bool = False
+    OPENFOOD_HEDGE_DELAY: Optional[float] = None  # seconds; None uses the observed p95 latency
+    OPENFOOD_HEDGE_MIN_DELAY: float = 0.05  # seconds
+
+    # Upstream rate limiting (OpenFood allows 100 product reads per minute per client)
+    OPENFOOD_RATE_LIMIT_PER_MINUTE: float = 100.0
+    OPENFOOD_RATE_LIMIT_BURST: int = 10
+    OPENFOOD_QUEUE_MAX_SIZE: int = 1000
+    OPENFOOD_QUEUE_MAX_WAIT_INTERACTIVE: float = 5.0  # seconds
+    OPENFOOD_QUEUE_MAX_WAIT_BACKGROUND: float = 60.0  # seconds
+
+    # Local product store built by scripts/ingest_openfood_dump.py, consulted before the API
+    LOCAL_STORE_PATH: Optional[str] = None
+
+    # In-process product cache
+    PRODUCT_CACHE_MAX_ENTRIES: int = 10000
+    PRODUCT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    PRODUCT_CACHE_TTL: float = 3600.0  # seconds an entry stays fresh
+    PRODUCT_CACHE_STALE_TTL: float = 86400.0  # seconds a stale entry is served while refreshing
+
+    # Negative cache of barcodes the OpenFood API reported as unknown
+    NOT_FOUND_CACHE_MAX_ENTRIES: int = 50000
+    NOT_FOUND_CACHE_TTL: float = 900.0  # seconds before an unknown barcode is asked for again
+
+    # Cache warm-up at startup: hot barcodes listed here and/or the most
+    # requested ones in an access log, looked up as background work
+    WARMUP_BARCODES: List[str] = []
+    WARMUP_ACCESS_LOG: Optional[str] = None
+    WARMUP_TOP_N: int = 1000
+    WARMUP_RATE_PER_SECOND: float = 1.0  # also paces refresh-ahead
+    WARMUP_CONCURRENCY: int = 4
+
+    # Refresh-ahead of often read products shortly before they go stale
+    REFRESH_AHEAD_ENABLED: bool = True
+    REFRESH_AHEAD_SECONDS: float = 300.0  # refresh when this much freshness is left
+    REFRESH_AHEAD_INTERVAL: float = 60.0  # seconds between scans of the product cache
+    REFRESH_AHEAD_MIN_READS: int = 3  # reads since the last refresh that make a product hot
+
+    # Memoized analysis results, keyed by product revision and scoring rules version
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 10000
+    ANALYSIS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # HTTP caching of product responses by clients (Cache-Control)
+    PRODUCT_HTTP_MAX_AGE: int = 300  # seconds a client may reuse a response
+    PRODUCT_HTTP_STALE_WHILE_REVALIDATE: int = 3600  # seconds it may be reused while revalidating
+
+    # Image proxy: on-disk store of product images and their reduced-size variants
+    # Absolute, so the store does not depend on the working directory
+    IMAGE_STORE_PATH: str = os.path.join(tempfile.gettempdir(), "iscan-image-cache")
+    IMAGE_STORE_MAX_BYTES: int = 1024 * 1024 * 1024
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024  # largest image fetched from upstream
+    IMAGE_ALLOWED_HOSTS: List[str] = ["images.openfoodfacts.org", "static.openfoodfacts.org"]
+    IMAGE_VARIANT_WIDTHS: List[int] = [100, 200, 400]  # needs Pillow
+    IMAGE_HTTP_MAX_AGE: int = 7 * 24 * 3600  # seconds clients may reuse an image
+    # Point Product image URLs at the proxy; the base URL is prepended when set
+    IMAGE_PROXY_REWRITE_URLS: bool = False
+    IMAGE_PROXY_BASE_URL: str = ""
+
+    # Batch lookups
+    BATCH_MAX_BARCODES: int = 500
+    BATCH_CONCURRENCY: int = 20
+
+    # WebSocket scanning sessions: lookups in flight per connection
+    WS_SESSION_MAX_PENDING: int = 16
+
+    # Healthier alternatives index; lookups are exact up to PER_CATEGORY results
+    ALTERNATIVES_PER_CATEGORY: int = 50  # best rated products kept per category tag
+    ALTERNATIVES_MAX_RESULTS: int = 20
+    ALTERNATIVES_INDEX_LOCAL_STORE: bool = True  # index LOCAL_STORE_PATH at startup
     
     class Config:
         case_sensitive = True
@@ -1,14 +1,76 @@
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config import get_settings
-from api.v1.endpoints import products
+from api.middleware import TimingMiddleware
+from api.responses import FastJSONResponse
+from api.v1.endpoints import images, metrics, products, stats
+from services.alternatives_index import load_local_store
+from services.cache_warmer import CacheWarmer
+from services.http_client import create_http_client
+from services.image_service import ImageService
+from services.image_store import ImageStore
+from services.local_store import LocalProductStore
+from services.openfood_service import OpenFoodService
+from services.product_service import ProductService
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client for the whole process, closed on shutdown
+    local_store = None
+    if settings.LOCAL_STORE_PATH:
+        local_store = LocalProductStore(settings.LOCAL_STORE_PATH, readonly=True)
+
+    async with create_http_client(settings) as client:
+        openfood_service = OpenFoodService(
+            client,
+            cache=OpenFoodService.create_cache(),
+            backends=[local_store] if local_store else [],
+            not_found_cache=OpenFoodService.create_not_found_cache(),
+        )
+        product_service = ProductService(
+            openfood_service,
+            cache=ProductService.create_cache(),
+            alternatives=ProductService.create_alternatives_index(),
+        )
+        app.state.openfood_service = openfood_service
+        app.state.product_service = product_service
+        # Indexing the image store walks its directory; keep it off the loop
+        image_store = await asyncio.to_thread(
+            ImageStore, settings.IMAGE_STORE_PATH, settings.IMAGE_STORE_MAX_BYTES
+        )
+        app.state.image_service = ImageService(client, image_store)
+
+        # Fill the caches with hot products in the background while serving
+        cache_warmer = CacheWarmer(product_service, openfood_service)
+        app.state.cache_warmer = cache_warmer
+        cache_warmer.start()
+
+        # Index the local store for alternatives lookups in the background
+        index_task = None
+        if local_store and settings.ALTERNATIVES_INDEX_LOCAL_STORE:
+            index_task = asyncio.create_task(
+                load_local_store(product_service.alternatives, settings.LOCAL_STORE_PATH)
+            )
+        yield
+        if index_task is not None:
+            index_task.cancel()
+            await asyncio.gather(index_task, return_exceptions=True)
+        await cache_warmer.aclose()
+        await openfood_service.aclose()
+
+    if local_store:
+        local_store.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Set up CORS middleware
@@ -20,12 +82,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage timings in a Server-Timing header and request latency histograms
+app.add_middleware(TimingMiddleware)
+
 # Include routers
 app.include_router(
     products.router,
     prefix=f"{settings.API_V1_STR}/products",
     tags=["products"]
 )
+app.include_router(
+    stats.router,
+    prefix=f"{settings.API_V1_STR}/stats",
+    tags=["stats"]
+)
+app.include_router(
+    images.router,
+    prefix=f"{settings.API_V1_STR}/images",
+    tags=["images"]
+)
+app.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["metrics"]
+)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class Alternative(BaseModel):
+    barcode: str = Field(..., description="Product barcode")
+    name: str = Field(..., description="Product name")
+    brand: str = Field(..., description="Product brand")
+    image: str = Field(..., description="Product image URL")
+    category: str = Field(..., description="Category tag shared with the requested product")
+    nutri_score: str = Field(..., description="Nutri-Score grade (a to e)")
+    rating_score: int = Field(..., description="Overall product rating (0-100)")
+    health_rating: str = Field(..., description="Overall health rating (good, moderate, poor)")
+
+class AlternativesResponse(BaseModel):
+    barcode: str = Field(..., description="Canonical barcode of the requested product")
+    rating_score: int = Field(..., description="Overall rating of the requested product (0-100)")
+    alternatives: List[Alternative] = Field(
+        default_factory=list,
+        description="Higher-rated products of the same categories, most specific category first, then best rated first"
+    )
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from config import get_settings
+from models.product_response import ProductResponse
+
+settings = get_settings()
+
+class BatchRequest(BaseModel):
+    barcodes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_BARCODES,
+        description=f"Product barcodes to look up, at most {settings.BATCH_MAX_BARCODES}"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "barcodes": ["3017620422003", "5449000000996"]
+            }
+        }
+
+class BatchItem(BaseModel):
+    barcode: str = Field(..., description="Requested product barcode")
+    status_code: int = Field(..., description="HTTP status of this lookup")
+    result: Optional[ProductResponse] = Field(None, description="Product information and analysis on success")
+    error: Optional[str] = Field(None, description="Error detail on failure")
+
+class BatchResponse(BaseModel):
+    results: List[BatchItem] = Field(..., description="One entry per requested barcode, in request order")
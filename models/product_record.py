@@ -0,0 +1,120 @@
+import sys
+from typing import Any, Optional, Tuple
+
+from services.openfood_fields import NUTRIMENT_FIELDS
+
+
+def _intern(value: Any) -> Any:
+    """Intern a string so every record holding it shares one object"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_tags(tags) -> Tuple:
+    return tuple(_intern(tag) for tag in tags)
+
+
+class ProductRecord:
+    """
+    Compact in-memory form of an OpenFood product
+
+    Holds only the fields read by read_product and ProductAnalysisService, in
+    slots instead of nested dicts. Grades and tags come from small
+    vocabularies and are interned, so records share one copy of each instead
+    of holding their own strings; per-100g values are a tuple in
+    NUTRIMENT_FIELDS order. Values keep the types found in the OpenFood
+    document, so the response built from a record is the one built from the
+    document itself.
+    """
+
+    __slots__ = (
+        "barcode",
+        "name",
+        "brand",
+        "category",
+        "categories",
+        "country",
+        "creator",
+        "image",
+        "image_ingredients",
+        "image_nutritions",
+        "ingredients",
+        "nutri_score",
+        "nutri_score_points",
+        "nova_group",
+        "eco_score",
+        "eco_score_points",
+        "allergens",
+        "additives",
+        "labels",
+        "nutriments",
+        "last_modified_t",
+        "rev",
+    )
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_product(cls, product: dict, barcode: str = "") -> "ProductRecord":
+        """
+        Build a record from an OpenFood product document
+
+        Args:
+            product (dict): The "product" object of an OpenFood API response
+            barcode (str): Barcode the product was looked up by, used when
+                the document carries neither "_id" nor "code"
+
+        Returns:
+            ProductRecord: Record with the consumed fields, normalized the way
+            ProductAnalysisService reads them
+        """
+        nutriments = product.get("nutriments", {})
+        return cls(
+            barcode=product.get("_id") or product.get("code") or barcode,
+            name=product.get("product_name", ""),
+            brand=product.get("brands", ""),
+            category=product.get("categories", ""),
+            categories=_intern_tags(product.get("categories_tags", [])),
+            country=product.get("countries", ""),
+            creator=_intern(product.get("creator", "")),
+            image=product.get("image_url", ""),
+            image_ingredients=product.get("image_ingredients_url", ""),
+            image_nutritions=product.get("image_nutrition_url", ""),
+            ingredients=product.get("ingredients_text", ""),
+            nutri_score=_intern(product.get("nutriscore_grade", "e").lower()),
+            nutri_score_points=product.get("nutriscore_score", 0),
+            nova_group=int(product.get("nova_group", 4)),
+            eco_score=_intern(product.get("ecoscore_grade", "e").lower()),
+            eco_score_points=product.get("ecoscore_score", 0),
+            allergens=_intern_tags(product.get("allergens_tags", [])),
+            additives=_intern_tags(product.get("additives_tags", [])),
+            labels=_intern_tags(tag.replace("en:", "") for tag in product.get("labels_tags", [])),
+            nutriments=tuple(nutriments.get(field, 0) for field in NUTRIMENT_FIELDS),
+            last_modified_t=product.get("last_modified_t"),
+            rev=product.get("rev"),
+        )
+
+    def revision(self) -> Optional[Tuple[Any, Any]]:
+        """Return (last_modified_t, rev), or None if the product carries neither"""
+        if self.last_modified_t is None and self.rev is None:
+            return None
+        return self.last_modified_t, self.rev
+
+    def size(self) -> int:
+        """
+        Return the approximate memory held by this record, in bytes
+
+        Interned strings and tags are shared between records and only counted
+        as the references that point to them.
+        """
+        size = sys.getsizeof(self)
+        for name in ("barcode", "name", "brand", "category", "country", "image",
+                     "image_ingredients", "image_nutritions", "ingredients"):
+            size += sys.getsizeof(getattr(self, name))
+        for name in ("categories", "allergens", "additives", "labels", "nutriments"):
+            size += sys.getsizeof(getattr(self, name))
+        return size + sum(sys.getsizeof(value) for value in self.nutriments)
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(barcode={self.barcode!r}, rev={self.rev!r})"
@@ -0,0 +1,41 @@
+"""
+Import an OpenFood bulk export into the local product store.
+
+Usage (from the project root):
+    python -m scripts.ingest_openfood_dump openfoodfacts-products.jsonl.gz
+    python -m scripts.ingest_openfood_dump en.openfoodfacts.org.products.csv.gz --db products.db
+
+Delta files are imported the same way; rows are only replaced by newer revisions.
+"""
+import argparse
+import logging
+import time
+
+from config import get_settings
+from services.local_store import LocalProductStore
+from services.openfood_dump import CSV, JSONL, iter_products
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Import an OpenFood bulk export into the local product store")
+    parser.add_argument("paths", nargs="+", help="JSONL or CSV export files, optionally gzip-compressed")
+    parser.add_argument("--format", choices=[JSONL, CSV], help="Dump format (detected from the file name by default)")
+    parser.add_argument("--db", default=settings.LOCAL_STORE_PATH or "products.db", help="SQLite store to write to")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    store = LocalProductStore(args.db)
+    try:
+        for path in args.paths:
+            started = time.perf_counter()
+            count = store.upsert_many(iter_products(path, args.format), batch_size=args.batch_size)
+            logging.info("Imported %d products from %s in %.1fs", count, path, time.perf_counter() - started)
+        logging.info("Store %s now holds %d products", args.db, store.count())
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Sequence, Tuple
+
+from models.product_record import ProductRecord
+from services.barcode import canonical_or_raw
+from services.local_store import LocalProductStore
+from services.product_analysis_service import ProductAnalysisService
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedProduct:
+    """Summary of a product held by an AlternativesIndex"""
+
+    __slots__ = ("barcode", "name", "brand", "image", "nutri_score",
+                 "rating_score", "health_rating", "categories", "listed")
+
+    def __init__(self, record: ProductRecord, rating_score: int, health_rating: str):
+        self.barcode = canonical_or_raw(record.barcode)
+        self.name = record.name
+        self.brand = record.brand
+        self.image = record.image
+        self.nutri_score = record.nutri_score
+        self.rating_score = rating_score
+        self.health_rating = health_rating
+        self.categories = tuple(dict.fromkeys(record.categories))
+        # Number of category lists the product currently appears in
+        self.listed = 0
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        """Position in a category list: best rated first, then by barcode"""
+        return -self.rating_score, self.barcode
+
+
+class AlternativesIndex:
+    """
+    In-memory index of the best rated products of every category
+
+    Products are grouped by their OpenFood category tags. Each category keeps
+    a list of its ``max_per_category`` best rated products, sorted by
+    rating_score, and products are added one at a time as they are analyzed
+    or read from the local store, so a lookup never needs the upstream API.
+
+    While products are only added or re-added with a higher rating, a list
+    holds the best rated products of its category seen so far, so the top K
+    higher-rated alternatives of any product are exact for K up to
+    ``max_per_category``. Products pushed out of a list are forgotten,
+    though: when a listed product is re-added with a lower rating, the
+    products it had pushed out are not restored, so the list may be short or
+    miss a product that now outranks it until that product is added again.
+
+    Not thread-safe: use it from the event loop, or build a separate index in
+    a worker thread and merge() it.
+    """
+
+    def __init__(self, max_per_category: int):
+        """
+        Args:
+            max_per_category (int): Products kept per category tag
+        """
+        self.max_per_category = max_per_category
+        self._products: Dict[str, IndexedProduct] = {}
+        self._categories: Dict[str, List[Tuple[int, str]]] = {}
+        self.updates = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, barcode: str) -> bool:
+        return barcode in self._products
+
+    @classmethod
+    def from_store(cls, path: str, max_per_category: int) -> "AlternativesIndex":
+        """
+        Build an index of every product in a local store
+
+        Blocks while the whole store is read; call it from a worker thread in
+        async code.
+
+        Args:
+            path (str): LocalProductStore SQLite file
+            max_per_category (int): Products kept per category tag
+
+        Returns:
+            AlternativesIndex: Index of the stored products
+        """
+        index = cls(max_per_category)
+        store = LocalProductStore(path, readonly=True)
+        try:
+            for product in store.iter_products():
+                record = ProductRecord.from_product(product)
+                rule = ProductAnalysisService.rate_record(record)
+                index.add(record, rule.score, rule.health_rating)
+        finally:
+            store.close()
+        return index
+
+    def add(self, record: ProductRecord, rating_score: int, health_rating: str) -> None:
+        """
+        Add a product, or update it if it is already indexed
+
+        Args:
+            record (ProductRecord): Product information
+            rating_score (int): Product rating_score
+            health_rating (str): Product health_rating
+        """
+        if not record.categories or not record.barcode or self.max_per_category <= 0:
+            return
+        self._insert(IndexedProduct(record, rating_score, health_rating))
+
+    async def merge(self, other: "AlternativesIndex", chunk_size: int = 1000) -> int:
+        """
+        Add the products of another index, yielding to the event loop between chunks
+
+        Products already indexed here were added since ``other`` was built and
+        are newer, so they are kept.
+
+        Args:
+            other (AlternativesIndex): Index built from an older source
+            chunk_size (int): Products added between yields
+
+        Returns:
+            int: Number of products added
+        """
+        added = 0
+        for i, product in enumerate(list(other._products.values()), start=1):
+            if product.barcode not in self._products:
+                product.listed = 0
+                self._insert(product)
+                added += 1
+            if i % chunk_size == 0:
+                await asyncio.sleep(0)
+        return added
+
+    def alternatives(
+        self, barcode: str, categories: Sequence[str], rating_score: int, limit: int
+    ) -> List[Tuple[IndexedProduct, str]]:
+        """
+        Return the best rated products that rate higher than a product
+
+        Categories are searched from the most specific tag (OpenFood lists
+        them from the most general to the most specific) to the most general
+        one, until ``limit`` alternatives are found.
+
+        Args:
+            barcode (str): Canonical barcode of the product, never returned
+            categories (Sequence[str]): Category tags of the product
+            rating_score (int): Product rating_score
+            limit (int): Maximum number of alternatives
+
+        Returns:
+            List[Tuple[IndexedProduct, str]]: (alternative, category tag it
+            was found in), most specific category first, then best rated first
+        """
+        found: List[Tuple[IndexedProduct, str]] = []
+        seen = {barcode}
+        for category in reversed(categories):
+            entries = self._categories.get(category)
+            if not entries:
+                continue
+            for key in entries:
+                if -key[0] <= rating_score:
+                    break
+                if key[1] in seen:
+                    continue
+                seen.add(key[1])
+                found.append((self._products[key[1]], category))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        """Return product/category counts and update counters"""
+        return {
+            "products": len(self._products),
+            "categories": len(self._categories),
+            "max_per_category": self.max_per_category,
+            "updates": self.updates,
+            "evictions": self.evictions,
+        }
+
+    def _insert(self, product: IndexedProduct) -> None:
+        previous = self._products.pop(product.barcode, None)
+        if previous is not None:
+            self._unlist(previous)
+        self.updates += 1
+
+        key = product.key
+        for category in product.categories:
+            entries = self._categories.setdefault(category, [])
+            if len(entries) >= self.max_per_category and key > entries[-1]:
+                continue
+            insort(entries, key)
+            product.listed += 1
+            if len(entries) > self.max_per_category:
+                self._drop(entries.pop()[1])
+        if product.listed:
+            self._products[product.barcode] = product
+
+    def _unlist(self, product: IndexedProduct) -> None:
+        key = product.key
+        for category in product.categories:
+            entries = self._categories.get(category)
+            if entries is None:
+                continue
+            i = bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+                if not entries:
+                    del self._categories[category]
+
+    def _drop(self, barcode: str) -> None:
+        """Account for a product pushed out of one of its category lists"""
+        self.evictions += 1
+        product = self._products[barcode]
+        product.listed -= 1
+        if product.listed == 0:
+            del self._products[barcode]
+
+
+async def load_local_store(index: AlternativesIndex, path: str) -> None:
+    """
+    Add every product of a local store to an index without blocking the event loop
+
+    Args:
+        index (AlternativesIndex): Live index, updated while the store is read
+        path (str): LocalProductStore SQLite file
+    """
+    started = time.monotonic()
+    built = await asyncio.to_thread(AlternativesIndex.from_store, path, index.max_per_category)
+    added = await index.merge(built)
+    logger.info(
+        "Indexed %d local products for alternatives in %.1fs",
+        added, time.monotonic() - started,
+    )
@@ -0,0 +1,79 @@
+"""
+Barcode normalization for GTIN-8/12/13/14 codes (EAN-8, UPC-A, EAN-13, GTIN-14).
+
+Scanners and users send the same product in several shapes: a 12-digit UPC-A,
+the same code zero-padded to an EAN-13 or a GTIN-14, a zero-padded EAN-8, with
+stray whitespace. OpenFood stores them as 13 digits (8 for EAN-8), so lookups,
+cache keys and upstream URLs all use that canonical form.
+"""
+
+# GTIN lengths accepted on input
+_GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+class InvalidBarcode(ValueError):
+    """Raised when a string is not a valid GTIN barcode"""
+
+
+def check_digit(digits: str) -> int:
+    """
+    Compute the GTIN check digit of a code without its check digit
+
+    Weights alternate 3, 1 starting from the rightmost digit, so the same
+    function serves every GTIN length and leading zeros do not matter.
+
+    Args:
+        digits (str): Code without its last (check) digit
+
+    Returns:
+        int: Expected check digit
+    """
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        total += int(digit) * (3 if position % 2 == 0 else 1)
+    return (10 - total % 10) % 10
+
+
+def normalize_barcode(raw: str) -> str:
+    """
+    Return the canonical form of a barcode
+
+    Whitespace is removed and the check digit verified. UPC-A and zero-padded
+    GTIN-14 codes become 13-digit EAN-13 codes; EAN-8 codes stay 8 digits, also
+    when zero-padded to a longer code, and GTIN-14 codes with a packaging
+    indicator stay 14 digits.
+
+    Args:
+        raw (str): Barcode as scanned or typed
+
+    Returns:
+        str: Canonical barcode
+
+    Raises:
+        InvalidBarcode: If the barcode has non-digit characters, an
+        unsupported length or a wrong check digit
+    """
+    code = "".join(raw.split())
+    if not code.isascii() or not code.isdigit():
+        raise InvalidBarcode(f"Barcode {raw!r} must contain only digits")
+    if len(code) not in _GTIN_LENGTHS:
+        raise InvalidBarcode(f"Barcode {raw!r} must have 8, 12, 13 or 14 digits")
+    if check_digit(code[:-1]) != int(code[-1]):
+        raise InvalidBarcode(f"Barcode {raw!r} has an invalid check digit")
+
+    if len(code) == 8:
+        return code
+    significant = code.lstrip("0")
+    if len(significant) <= 8:
+        return significant.zfill(8)
+    if len(significant) <= 13:
+        return significant.zfill(13)
+    return code
+
+
+def canonical_or_raw(raw: str) -> str:
+    """Return the canonical form of a barcode, or the barcode unchanged if it is invalid"""
+    try:
+        return normalize_barcode(raw)
+    except InvalidBarcode:
+        return raw
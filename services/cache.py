@@ -0,0 +1,174 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at", "stale_until", "reads")
+
+    def __init__(self, value: Any, size: int, expires_at: float, stale_until: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.reads = 0
+
+
+class TTLCache:
+    """
+    In-process LRU cache bounded by entry count and by bytes
+
+    Every entry has a TTL after which it becomes stale. Stale entries are still
+    returned (flagged as such) for ``stale_ttl`` more seconds so that callers
+    can serve them while refreshing in the background. Entries older than that
+    are reported as misses but kept until they are replaced or evicted, so
+    ``peek`` can still return them as a last resort.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries (int): Maximum number of entries
+            max_bytes (int): Maximum total size of all entries in bytes
+            ttl (float): Seconds an entry stays fresh
+            stale_ttl (float): Seconds an entry may be served stale after expiry
+            clock (Callable[[], float]): Monotonic time source
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """
+        Look up a key and mark it as recently used
+
+        Args:
+            key (Hashable): Cache key
+
+        Returns:
+            Tuple[Optional[Any], str]: (value, state) where state is FRESH,
+            STALE or MISS; value is None on MISS
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        now = self._clock()
+        if now >= entry.stale_until:
+            self.misses += 1
+            return None, MISS
+
+        self._entries.move_to_end(key)
+        entry.reads += 1
+        if now < entry.expires_at:
+            self.hits += 1
+            return entry.value, FRESH
+
+        self.stale_hits += 1
+        return entry.value, STALE
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Return a value regardless of its age, without touching LRU order or counters
+
+        Args:
+            key (Hashable): Cache key
+
+        Returns:
+            Optional[Any]: Stored value, or None if the key is not cached
+        """
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, size: int) -> None:
+        """
+        Store a value, evicting least recently used entries to stay in bounds
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store
+            size (int): Approximate size of the value in bytes
+        """
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        now = self._clock()
+        expires_at = now + self.ttl
+        self._entries[key] = _Entry(value, size, expires_at, expires_at + self.stale_ttl)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def expiring(self, within: float, min_reads: int = 0) -> List[Hashable]:
+        """
+        Return the keys of entries that go stale soon and are read often
+
+        Args:
+            within (float): Seconds of freshness left, at most
+            min_reads (int): Reads an entry must have had since it was stored
+
+        Returns:
+            List[Hashable]: Keys of entries still within their stale window,
+            most recently used first
+        """
+        now = self._clock()
+        return [
+            key for key, entry in reversed(self._entries.items())
+            if entry.expires_at - now <= within
+            and now < entry.stale_until
+            and entry.reads >= min_reads
+        ]
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if it is present"""
+        if key in self._entries:
+            self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry/byte usage and hit, miss and eviction counters"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
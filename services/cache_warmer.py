@@ -0,0 +1,183 @@
+import asyncio
+import gzip
+import logging
+import re
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from fastapi import HTTPException
+from config import get_settings
+from services.barcode import InvalidBarcode, normalize_barcode
+from services.openfood_service import OpenFoodService
+from services.product_service import ProductService
+from services.upstream_scheduler import Priority
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Product lookups in uvicorn and common/combined access log lines
+_PRODUCT_REQUEST = re.compile(r'"(?:GET|HEAD) [^"\s]*/products/([^/?"\s]+)[?"\s]')
+
+
+def top_barcodes_from_log(path: str, limit: int) -> List[str]:
+    """
+    Return the most requested barcodes found in an access log
+
+    Args:
+        path (str): Access log file, optionally gzip-compressed (.gz)
+        limit (int): Number of barcodes to return
+
+    Returns:
+        List[str]: Canonical barcodes, most requested first; invalid
+        barcodes and other routes are skipped
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    counts = Counter()
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _PRODUCT_REQUEST.search(line)
+            if match is None:
+                continue
+            try:
+                counts[normalize_barcode(match.group(1))] += 1
+            except InvalidBarcode:
+                continue
+    return [barcode for barcode, _ in counts.most_common(limit)]
+
+
+class CacheWarmer:
+    """
+    Preload hot products at startup and refresh them before they expire
+
+    The warm-up phase looks up the configured hot barcodes (WARMUP_BARCODES,
+    then the top WARMUP_TOP_N barcodes of WARMUP_ACCESS_LOG) through the
+    product service, filling the product and analysis caches. The
+    refresh-ahead loop periodically reloads cached products that are read
+    often and go stale within REFRESH_AHEAD_SECONDS, so they are replaced
+    before interactive requests see them expire.
+
+    Both run as background tasks at no more than WARMUP_RATE_PER_SECOND
+    lookups with WARMUP_CONCURRENCY in flight, and their upstream calls are
+    scheduled behind interactive scans.
+    """
+
+    def __init__(self, product_service: ProductService, openfood_service: OpenFoodService):
+        """
+        Args:
+            product_service (ProductService): Service whose caches are warmed
+            openfood_service (OpenFoodService): Upstream service whose product
+                cache is refreshed ahead of expiry
+        """
+        self.product_service = product_service
+        self.openfood_service = openfood_service
+        self.warmed = 0
+        self.warm_failures = 0
+        self.refreshed = 0
+        self.refresh_failures = 0
+        self.warmup_done = False
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the warm-up phase and the refresh-ahead loop"""
+        self._tasks.append(asyncio.create_task(self._warm_up()))
+        if settings.REFRESH_AHEAD_ENABLED and self.openfood_service.cache is not None:
+            self._tasks.append(asyncio.create_task(self._refresh_ahead()))
+
+    async def aclose(self) -> None:
+        """Stop the background tasks"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        """Return warm-up and refresh-ahead counters"""
+        return {
+            "warmup_done": self.warmup_done,
+            "warmed": self.warmed,
+            "warm_failures": self.warm_failures,
+            "refreshed": self.refreshed,
+            "refresh_failures": self.refresh_failures,
+        }
+
+    @staticmethod
+    def hot_barcodes() -> List[str]:
+        """Return the configured hot barcodes, deduplicated, in priority order"""
+        barcodes = []
+        for barcode in settings.WARMUP_BARCODES:
+            try:
+                barcodes.append(normalize_barcode(barcode))
+            except InvalidBarcode:
+                logger.warning("Skipping invalid warm-up barcode %r", barcode)
+        if settings.WARMUP_ACCESS_LOG:
+            try:
+                barcodes.extend(top_barcodes_from_log(settings.WARMUP_ACCESS_LOG, settings.WARMUP_TOP_N))
+            except OSError as e:
+                logger.warning("Cannot read warm-up access log %s: %s", settings.WARMUP_ACCESS_LOG, e)
+        return list(dict.fromkeys(barcodes))
+
+    async def _warm_up(self) -> None:
+        barcodes = await asyncio.to_thread(self.hot_barcodes)
+        started = time.monotonic()
+        await self._paced(barcodes, self._warm)
+        self.warmup_done = True
+        if barcodes:
+            logger.info(
+                "Warmed %d of %d hot products in %.1fs",
+                self.warmed, len(barcodes), time.monotonic() - started,
+            )
+
+    async def _warm(self, barcode: str) -> None:
+        try:
+            await self.product_service.get_product(barcode, Priority.BACKGROUND)
+        except HTTPException as e:
+            self.warm_failures += 1
+            logger.debug("Warm-up of %s failed: %s", barcode, e.detail)
+            return
+        self.warmed += 1
+
+    async def _refresh_ahead(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REFRESH_AHEAD_INTERVAL)
+            barcodes = self.openfood_service.cache.expiring(
+                settings.REFRESH_AHEAD_SECONDS, min_reads=settings.REFRESH_AHEAD_MIN_READS
+            )
+            await self._paced(barcodes, self._refresh)
+
+    async def _refresh(self, barcode: str) -> None:
+        if await self.openfood_service.refresh(barcode):
+            self.refreshed += 1
+        else:
+            self.refresh_failures += 1
+
+    @staticmethod
+    async def _paced(barcodes: Iterable[str], fn: Callable[[str], Awaitable[None]]) -> None:
+        """Run fn for every barcode at the configured rate and concurrency"""
+        semaphore = asyncio.Semaphore(settings.WARMUP_CONCURRENCY)
+        interval = 1.0 / settings.WARMUP_RATE_PER_SECOND
+        tasks = set()
+
+        async def run(barcode: str) -> None:
+            try:
+                await fn(barcode)
+            except Exception:
+                logger.exception("Background lookup of %s failed", barcode)
+            finally:
+                semaphore.release()
+
+        next_start: Optional[float] = None
+        try:
+            for barcode in barcodes:
+                await semaphore.acquire()
+                now = time.monotonic()
+                if next_start is not None and now < next_start:
+                    await asyncio.sleep(next_start - now)
+                next_start = max(now, next_start or now) + interval
+                task = asyncio.create_task(run(barcode))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
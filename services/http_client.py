@@ -0,0 +1,34 @@
+import httpx
+from config import Settings
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    Create the shared upstream HTTP client
+
+    One client is created per application (see the lifespan in main.py) so that
+    connections to OpenFood are pooled and kept alive between scans instead of
+    paying DNS, TCP and TLS setup on every request.
+
+    Args:
+        settings (Settings): Application settings
+
+    Returns:
+        httpx.AsyncClient: Pooled client, to be closed on shutdown
+    """
+    limits = httpx.Limits(
+        max_connections=settings.OPENFOOD_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENFOOD_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENFOOD_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.OPENFOOD_CONNECT_TIMEOUT,
+        read=settings.OPENFOOD_READ_TIMEOUT,
+        write=settings.OPENFOOD_WRITE_TIMEOUT,
+        pool=settings.OPENFOOD_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.OPENFOOD_HTTP2,
+    )
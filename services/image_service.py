@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import io
+from typing import Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+from fastapi import HTTPException
+from config import get_settings
+from services.image_store import ImageStore, StoredImage
+from services.single_flight import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is only needed for resized variants
+    Image = None
+
+settings = get_settings()
+
+# Pillow format names of the content types an ImageStore accepts
+_FORMATS = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+# Lookups of an image that keeps being evicted before it is read
+_MAX_ATTEMPTS = 3
+
+
+def proxy_image_url(url: str) -> str:
+    """
+    Point an OpenFood image URL at the image proxy
+
+    Args:
+        url (str): Image URL from an OpenFood product
+
+    Returns:
+        str: Proxy URL when IMAGE_PROXY_REWRITE_URLS is set and the URL is on
+        an allowed host, otherwise the URL unchanged
+    """
+    if not settings.IMAGE_PROXY_REWRITE_URLS or not url:
+        return url
+    if urlsplit(url).hostname not in settings.IMAGE_ALLOWED_HOSTS:
+        return url
+    return f"{settings.IMAGE_PROXY_BASE_URL}{settings.API_V1_STR}/images?url={quote(url, safe='')}"
+
+
+class ImageService:
+    """
+    Fetch product images once and serve them from an on-disk store
+
+    Originals are downloaded from allowed hosts through the shared upstream
+    client, and reduced-size variants are made with Pillow when it is
+    installed. Both are kept in the ImageStore; concurrent requests for the
+    same image share one download.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, store: ImageStore):
+        """
+        Args:
+            client (httpx.AsyncClient): Shared, pooled upstream client
+            store (ImageStore): On-disk store of originals and variants
+        """
+        self.client = client
+        self.store = store
+        self.flight = SingleFlight()
+        self.downloads = 0
+        self.resizes = 0
+
+    async def get_image(self, url: str, width: Optional[int] = None) -> StoredImage:
+        """
+        Return an image from the store, fetching or resizing it on a miss
+
+        Args:
+            url (str): Image URL on an allowed host
+            width (Optional[int]): Width of a reduced-size variant, one of
+                IMAGE_VARIANT_WIDTHS; None for the original image. Without
+                Pillow the original is returned for every width.
+
+        Returns:
+            StoredImage: Stored image file
+
+        Raises:
+            HTTPException: If the URL or width is not allowed, or the image
+            cannot be fetched
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.hostname not in settings.IMAGE_ALLOWED_HOSTS:
+            raise HTTPException(status_code=400, detail="Image URL is not on an allowed host")
+        if width is not None and width not in settings.IMAGE_VARIANT_WIDTHS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Image width must be one of {settings.IMAGE_VARIANT_WIDTHS}"
+            )
+        if Image is None:
+            width = None
+
+        key = self._key(url, width)
+        image = self.store.get(key)
+        if image is not None:
+            return image
+        return await self.flight.do(key, lambda: self._load(url, width, key))
+
+    async def link_image(
+        self, url: str, width: Optional[int] = None, image: Optional[StoredImage] = None
+    ) -> Tuple[StoredImage, str]:
+        """
+        Return an image with a private hard link to its file for serving
+
+        The link keeps its content even if the store evicts the image while
+        it is being sent. A file evicted before it could be linked is fetched
+        again.
+
+        Args:
+            url (str): Image URL on an allowed host
+            width (Optional[int]): Width of a reduced-size variant, see get_image()
+            image (Optional[StoredImage]): Image already returned by
+                get_image() for the same arguments
+
+        Returns:
+            Tuple[StoredImage, str]: Stored image and the path of its link;
+            the caller deletes the link
+
+        Raises:
+            HTTPException: If the URL or width is not allowed, or the image
+            cannot be fetched
+        """
+        for _ in range(_MAX_ATTEMPTS):
+            if image is None:
+                image = await self.get_image(url, width)
+            try:
+                return image, self.store.link(image)
+            except FileNotFoundError:
+                self.store.discard(image)
+                image = None
+        raise HTTPException(status_code=503, detail="Image was evicted before it could be read")
+
+    def stats(self) -> dict:
+        """Return store usage and download counters"""
+        return {
+            "store": self.store.stats(),
+            "downloads": self.downloads,
+            "resizes": self.resizes,
+            "in_flight": len(self.flight),
+        }
+
+    @staticmethod
+    def _key(url: str, width: Optional[int]) -> str:
+        return hashlib.sha256(f"{url}|{width or 0}".encode("utf-8")).hexdigest()
+
+    async def _load(self, url: str, width: Optional[int], key: str) -> StoredImage:
+        if width is None:
+            data, content_type = await self._download(url)
+            if Image is not None:
+                await asyncio.to_thread(self._check_decodable, data)
+            return await asyncio.to_thread(self.store.put, key, data, content_type)
+
+        for _ in range(_MAX_ATTEMPTS):
+            original = await self.get_image(url)
+            try:
+                data, content_type = await asyncio.to_thread(self._resize, original.path, width)
+                break
+            except FileNotFoundError:
+                # Evicted between lookup and resize; fetch the original again
+                self.store.discard(original)
+            except HTTPException:
+                # Stored before originals were checked; do not keep serving it
+                self.store.discard(original)
+                raise
+        else:
+            raise HTTPException(status_code=503, detail="Image was evicted before it could be resized")
+        self.resizes += 1
+        return await asyncio.to_thread(self.store.put, key, data, content_type)
+
+    async def _download(self, url: str) -> Tuple[bytes, str]:
+        """Download an image, enforcing IMAGE_MAX_BYTES and a supported content type"""
+        try:
+            async with self.client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=502 if response.status_code >= 500 else 404,
+                        detail=f"Image upstream answered {response.status_code}"
+                    )
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if content_type not in _FORMATS.values():
+                    raise HTTPException(status_code=502, detail=f"Unsupported image type {content_type!r}")
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > settings.IMAGE_MAX_BYTES:
+                        raise HTTPException(status_code=502, detail="Image is too large")
+                    chunks.append(chunk)
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=502, detail=f"Network error occurred: {str(e)}")
+        self.downloads += 1
+        return b"".join(chunks), content_type
+
+    @staticmethod
+    def _check_decodable(data: bytes) -> None:
+        """Reject an original that Pillow cannot open, so it is never stored"""
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format = _pillow_format(image)
+                image.verify()
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise HTTPException(status_code=502, detail="Image cannot be decoded")
+        if image_format not in _FORMATS:
+            raise HTTPException(status_code=502, detail=f"Unsupported image format {image_format!r}")
+
+    @staticmethod
+    def _resize(path: str, width: int) -> Tuple[bytes, str]:
+        """
+        Return a copy of an image at most ``width`` pixels wide, in its own format
+
+        Raises:
+            FileNotFoundError: If the file was evicted from the store
+            HTTPException: If Pillow cannot decode or re-encode the image
+        """
+        try:
+            with Image.open(path) as image:
+                image_format = _pillow_format(image)
+                if image_format not in _FORMATS:
+                    raise HTTPException(status_code=502, detail=f"Unsupported image format {image_format!r}")
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    image = image.resize((width, height), Image.LANCZOS)
+                out = io.BytesIO()
+                if image_format == "JPEG":
+                    image.save(out, format=image_format, quality=85, optimize=True)
+                else:
+                    image.save(out, format=image_format)
+        except FileNotFoundError:
+            raise
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise HTTPException(status_code=502, detail="Image cannot be resized")
+        return out.getvalue(), _FORMATS[image_format]
+
+
+def _pillow_format(image: "Image.Image") -> str:
+    # Multi-picture JPEGs (MPO) are saved as plain JPEG
+    return "JPEG" if image.format == "MPO" else image.format
@@ -0,0 +1,217 @@
+import os
+import secrets
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# File suffix of every stored image content type, and back
+_SUFFIXES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+_CONTENT_TYPES = {suffix: content_type for content_type, suffix in _SUFFIXES.items()}
+
+# Directory under the root holding the hard links of images being served
+_SERVING_DIR = ".serving"
+
+
+class StoredImage:
+    """Image file held by an ImageStore"""
+
+    __slots__ = ("path", "content_type", "stat", "etag")
+
+    def __init__(self, path: str, content_type: str, stat: os.stat_result):
+        self.path = path
+        self.content_type = content_type
+        self.stat = stat
+        # Files are written once and never modified, so size and mtime
+        # identify the content
+        name = os.path.basename(path).split(".", 1)[0]
+        self.etag = f'"{name[:16]}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+class ImageStore:
+    """
+    Size-bounded on-disk LRU store of images
+
+    Images are stored under a key chosen by the caller, one file per key in a
+    two-level directory fan-out, and written atomically. The least recently
+    used files are deleted once the total size exceeds ``max_bytes``. The
+    index is rebuilt from the directory on startup, oldest files first.
+
+    Images are served through private hard links (see link()), so evicting
+    or replacing an image never affects a response that is being sent.
+
+    Safe to use from the event loop and from worker threads at the same time.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        """
+        Args:
+            root (str): Directory holding the images, created if missing
+            max_bytes (int): Maximum total size of the stored images in bytes
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, StoredImage]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._serving = os.path.join(root, _SERVING_DIR)
+        os.makedirs(self._serving, exist_ok=True)
+        self._load_index()
+
+    def get(self, key: str) -> Optional[StoredImage]:
+        """
+        Look up an image and mark it as recently used
+
+        Args:
+            key (str): Image key
+
+        Returns:
+            Optional[StoredImage]: Stored image, or None if it is not stored
+        """
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: str, data: bytes, content_type: str) -> StoredImage:
+        """
+        Store an image, evicting least recently used images to stay in bounds
+
+        Blocks on disk I/O; call it from a worker thread in async code.
+
+        Args:
+            key (str): Image key, made of characters valid in file names
+            data (bytes): Encoded image
+            content_type (str): Image media type
+
+        Returns:
+            StoredImage: The stored image
+
+        Raises:
+            ValueError: If the content type is not a supported image type
+        """
+        suffix = _SUFFIXES.get(content_type)
+        if suffix is None:
+            raise ValueError(f"Unsupported image type {content_type}")
+
+        directory = os.path.join(self.root, key[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, key + suffix)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        image = StoredImage(path, content_type, os.stat(path))
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.stat.st_size
+                if previous.path != path:
+                    self._unlink(previous.path)
+            self._entries[key] = image
+            self._bytes += image.stat.st_size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.stat.st_size
+                self._unlink(evicted.path)
+                self.evictions += 1
+        return image
+
+    def link(self, image: StoredImage) -> str:
+        """
+        Create a private hard link to an image file for serving it
+
+        The link keeps the content readable under its own name even if the
+        image is evicted or stored again meanwhile. The caller deletes it
+        once the response has been sent.
+
+        Args:
+            image (StoredImage): Image returned by get() or put()
+
+        Returns:
+            str: Path of the link
+
+        Raises:
+            FileNotFoundError: If the image file has been evicted
+        """
+        name = secrets.token_hex(8) + os.path.splitext(image.path)[1]
+        path = os.path.join(self._serving, name)
+        os.link(image.path, path)
+        return path
+
+    def discard(self, image: StoredImage) -> None:
+        """
+        Remove an image, e.g. after its file was found missing or unreadable
+
+        Does nothing if its key has been stored again since.
+
+        Args:
+            image (StoredImage): Image returned by get() or put()
+        """
+        key = os.path.basename(image.path).split(".", 1)[0]
+        with self._lock:
+            if self._entries.get(key) is not image:
+                return
+            del self._entries[key]
+            self._bytes -= image.stat.st_size
+        self._unlink(image.path)
+
+    def stats(self) -> Dict[str, int]:
+        """Return file/byte usage and hit, miss and eviction counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _load_index(self) -> None:
+        found = []
+        for directory, directories, files in os.walk(self.root):
+            if directory == self._serving:
+                # Links left behind by responses cut short by a shutdown
+                for name in files:
+                    self._unlink(os.path.join(directory, name))
+                continue
+            for name in files:
+                path = os.path.join(directory, name)
+                key, _, suffix = name.partition(".")
+                content_type = _CONTENT_TYPES.get("." + suffix)
+                if content_type is None:
+                    # Leftover temporary file of an interrupted write
+                    self._unlink(path)
+                    continue
+                found.append((key, StoredImage(path, content_type, os.stat(path))))
+        found.sort(key=lambda item: item[1].stat.st_mtime_ns)
+        for key, image in found:
+            self._entries[key] = image
+            self._bytes += image.stat.st_size
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,157 @@
+import asyncio
+import sqlite3
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from services import json_codec
+from services.barcode import canonical_or_raw
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    barcode TEXT PRIMARY KEY,
+    last_modified_t INTEGER NOT NULL DEFAULT 0,
+    data BLOB NOT NULL
+) WITHOUT ROWID
+"""
+
+# Rows from a delta file only replace rows that are not newer than them
+_UPSERT = """
+INSERT INTO products (barcode, last_modified_t, data) VALUES (?, ?, ?)
+ON CONFLICT(barcode) DO UPDATE SET
+    last_modified_t = excluded.last_modified_t,
+    data = excluded.data
+WHERE excluded.last_modified_t >= products.last_modified_t
+"""
+
+
+class LocalProductStore:
+    """
+    SQLite product store indexed by barcode
+
+    Holds products projected to the fields the API consumes, as written by
+    ``python -m scripts.ingest_openfood_dump``. It is used by OpenFoodService
+    as a backend that is consulted before the live API.
+
+    Backend lookups run in worker threads, each with its own connection, so
+    reads from cold pages of a large store never block the event loop.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        """
+        Args:
+            path (str): SQLite database file
+            readonly (bool): Open without write access (the API server does)
+        """
+        self.path = path
+        self.readonly = readonly
+        self._conn = self._connect()
+        # Connections of the worker threads serving get_product
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        if not readonly:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+
+    async def get_product(self, barcode: str) -> Optional[dict]:
+        """
+        Look up a product by barcode; backend interface used by OpenFoodService
+
+        The lookup runs in a worker thread, on that thread's connection.
+
+        Args:
+            barcode (str): Product barcode
+
+        Returns:
+            Optional[dict]: Product information shaped like an OpenFood API
+            response, or None if the barcode is not in the store
+        """
+        return await asyncio.to_thread(self._get_in_thread, barcode)
+
+    def upsert_many(self, products: Iterable[dict], batch_size: int = 5000) -> int:
+        """
+        Insert or update products, committing every ``batch_size`` rows
+
+        Rows are keyed by the canonical barcode, as looked up by
+        OpenFoodService. Existing rows are only replaced by products with the same or a newer
+        ``last_modified_t``, so delta files can be re-imported in any order.
+
+        Args:
+            products (Iterable[dict]): Projected products
+            batch_size (int): Rows per transaction
+
+        Returns:
+            int: Number of products read
+        """
+        rows = (
+            (
+                canonical_or_raw(product["_id"]),
+                int(product.get("last_modified_t") or 0),
+                json_codec.dumps(product),
+            )
+            for product in products
+        )
+        total = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            with self._conn:
+                self._conn.executemany(_UPSERT, batch)
+            total += len(batch)
+        return total
+
+    def iter_products(self, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        Stream every stored product, ``batch_size`` rows at a time
+
+        Args:
+            batch_size (int): Rows fetched per round trip
+
+        Yields:
+            dict: Projected product
+        """
+        cursor = self._conn.execute("SELECT data FROM products")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (data,) in rows:
+                yield json_codec.loads(data)
+
+    def count(self) -> int:
+        """Return the number of stored products"""
+        return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def close(self) -> None:
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections may be closed by close() from another thread
+        if self.readonly:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def _get_in_thread(self, barcode: str) -> Optional[dict]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return self._get(conn, barcode)
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, barcode: str) -> Optional[dict]:
+        row = conn.execute(
+            "SELECT data FROM products WHERE barcode = ?", (barcode,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"code": barcode, "status": 1, "product": json_codec.loads(row[0])}
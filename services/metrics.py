@@ -0,0 +1,343 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from sub-millisecond CPU stages to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# (stage, seconds) pairs recorded while serving the current request, or None
+# outside of a request
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge:
+    """Value that goes up and down, with optional labels"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, in the Prometheus layout
+
+    Observations only increment one bucket; the cumulative counts are
+    computed when the metric is rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> Iterable[str]:
+        bucket_labels = self.labelnames + ("le",)
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(bucket_labels, labels + (_format_value(bound),))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            suffix = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {_format_value(total)}"
+            yield f"{self.name}_count{suffix} {cumulative}"
+
+
+class Registry:
+    """Set of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, extra: Iterable = ()) -> str:
+        """
+        Render all registered metrics
+
+        Args:
+            extra (Iterable): Additional metrics built at scrape time
+
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in list(self._metrics) + list(extra):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "iscan_stage_duration_seconds",
+    "Time spent in each stage of a product lookup",
+    ("stage",),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "iscan_http_request_duration_seconds",
+    "Time to serve HTTP requests, by route and status code",
+    ("method", "route", "status"),
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "iscan_http_requests_in_flight",
+    "HTTP requests currently being served",
+))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "iscan_upstream_responses",
+    "OpenFood API responses by status code, or 'error' for network failures",
+    ("status",),
+))
+UPSTREAM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "iscan_upstream_requests_in_flight",
+    "OpenFood API requests currently waiting for a response",
+))
+
+
+class stage:
+    """
+    Time a block as one stage of the current request
+
+    The duration goes to the stage histogram, and to the Server-Timing header
+    of the request being served, if any.
+
+    Example:
+        with stage("analyze"):
+            ...
+    """
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        record_stage(self.name, time.perf_counter() - self.started)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record the duration of a stage measured by the caller"""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def record_request_stage(name: str, seconds: float) -> None:
+    """
+    Record a stage for the Server-Timing header of the current request only
+
+    For waits on work that another task timed, whose stages already went to
+    the stage histogram, e.g. a shared upstream lookup.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def start_request():
+    """
+    Start collecting stage timings for the current request
+
+    Returns:
+        A token to pass to end_request
+    """
+    return _request_timings.set([])
+
+
+def end_request(token) -> List[Tuple[str, float]]:
+    """
+    Stop collecting stage timings for the current request
+
+    Args:
+        token: Value returned by start_request
+
+    Returns:
+        List[Tuple[str, float]]: Stages recorded so far, as (name, seconds)
+    """
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings or []
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    """Return the stages recorded so far for the current request"""
+    return _request_timings.get() or []
+
+
+def server_timing(timings: Iterable[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Build a Server-Timing header value
+
+    Repeated stages (e.g. retried upstream calls) are summed.
+
+    Args:
+        timings (Iterable[Tuple[str, float]]): (stage, seconds) pairs
+        total (Optional[float]): Whole request duration in seconds
+
+    Returns:
+        str: Header value with durations in milliseconds
+    """
+    durations: Dict[str, float] = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in durations.items())
+
+
+def pipeline_metrics(stats: dict) -> List:
+    """
+    Build scrape-time metrics from ProductService.stats()
+
+    The caches and the upstream components keep their own counters, so they
+    are read when /metrics is scraped instead of being counted twice on the
+    hot path.
+
+    Args:
+        stats (dict): Counters returned by ProductService.stats()
+
+    Returns:
+        List: Metrics to pass to Registry.render
+    """
+    cache_requests = Counter(
+        "iscan_cache_requests", "Cache lookups by cache and outcome", ("cache", "outcome")
+    )
+    cache_evictions = Counter("iscan_cache_evictions", "Cache evictions by cache", ("cache",))
+    cache_entries = Gauge("iscan_cache_entries", "Entries held by each cache", ("cache",))
+    cache_bytes = Gauge("iscan_cache_bytes", "Approximate bytes held by each cache", ("cache",))
+    caches = (("product", "product_cache"), ("not_found", "not_found_cache"), ("analysis", "analysis_cache"))
+    for cache, key in caches:
+        cache_stats = stats.get(key)
+        if cache_stats is None:
+            continue
+        cache_requests.inc(cache, "fresh", amount=cache_stats["hits"])
+        cache_requests.inc(cache, "stale", amount=cache_stats["stale_hits"])
+        cache_requests.inc(cache, "miss", amount=cache_stats["misses"])
+        cache_evictions.inc(cache, amount=cache_stats["evictions"])
+        cache_entries.set(cache_stats["entries"], cache)
+        cache_bytes.set(cache_stats["bytes"], cache)
+
+    flight = stats["single_flight"]
+    flight_in_flight = Gauge("iscan_single_flight_in_flight", "Distinct barcodes being fetched upstream")
+    flight_in_flight.set(flight["in_flight"])
+    flight_calls = Counter(
+        "iscan_single_flight_calls", "Upstream lookups that started or joined a shared call", ("outcome",)
+    )
+    flight_calls.inc("started", amount=flight["started"])
+    flight_calls.inc("coalesced", amount=flight["coalesced"])
+    flight_calls.inc("timeout", amount=flight["timeouts"])
+
+    refreshing = Gauge("iscan_background_refreshes_in_flight", "Stale cache entries being refreshed")
+    refreshing.set(stats["refreshing"])
+
+    scheduler_queued = Gauge(
+        "iscan_scheduler_queued", "Lookups waiting for an upstream request slot", ("priority",)
+    )
+    for priority, priority_stats in stats["scheduler"]["classes"].items():
+        scheduler_queued.set(priority_stats["queued"], priority)
+
+    breaker_open = Gauge("iscan_circuit_breaker_open", "1 when the upstream circuit breaker is open")
+    breaker_open.set(1 if stats["circuit_breaker"]["state"] == "open" else 0)
+
+    upstream_retries = Counter("iscan_upstream_retries", "Upstream requests retried after a failure")
+    upstream_retries.inc(amount=stats["retries"])
+    stale_fallbacks = Counter(
+        "iscan_stale_fallbacks", "Lookups answered from an expired cache entry during an upstream failure"
+    )
+    stale_fallbacks.inc(amount=stats["stale_fallbacks"])
+
+    return [
+        cache_requests, cache_evictions, cache_entries, cache_bytes,
+        flight_in_flight, flight_calls, refreshing, scheduler_queued,
+        breaker_open, upstream_retries, stale_fallbacks,
+    ]
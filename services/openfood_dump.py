@@ -0,0 +1,144 @@
+import csv
+import gzip
+import logging
+import sys
+from typing import IO, Iterator, Optional
+
+from services import json_codec
+from services.openfood_fields import NUTRIMENT_FIELDS, project_product
+
+logger = logging.getLogger(__name__)
+
+JSONL = "jsonl"
+CSV = "csv"
+
+# Columns of the OpenFood CSV export that hold comma-separated tag lists
+_CSV_TAG_COLUMNS = {
+    "allergens_tags": "allergens",
+    "categories_tags": "categories_tags",
+    "additives_tags": "additives_tags",
+    "labels_tags": "labels_tags",
+}
+_CSV_TEXT_COLUMNS = (
+    "product_name",
+    "brands",
+    "categories",
+    "countries",
+    "creator",
+    "image_url",
+    "image_ingredients_url",
+    "image_nutrition_url",
+    "ingredients_text",
+    "nutriscore_grade",
+    "ecoscore_grade",
+)
+_CSV_INT_COLUMNS = ("nutriscore_score", "nova_group", "ecoscore_score", "last_modified_t")
+
+
+def detect_format(path: str) -> str:
+    """
+    Guess the dump format from the file name
+
+    Args:
+        path (str): Dump file path, optionally ending in .gz
+
+    Returns:
+        str: JSONL or CSV
+
+    Raises:
+        ValueError: If the extension is not recognised
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".json")):
+        return JSONL
+    if name.endswith((".csv", ".tsv")):
+        return CSV
+    raise ValueError(f"Cannot detect dump format of {path}, pass it explicitly")
+
+
+def open_dump(path: str) -> IO[str]:
+    """Open a dump file as text, transparently decompressing gzip"""
+    with open(path, "rb") as f:
+        is_gzip = f.read(2) == b"\x1f\x8b"
+    if is_gzip:
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def iter_products(path: str, fmt: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream projected products from an OpenFood bulk export
+
+    Products are read one at a time, so memory use does not depend on the
+    size of the dump.
+
+    Args:
+        path (str): Path to a JSONL or CSV export, optionally gzip-compressed
+        fmt (Optional[str]): JSONL or CSV; detected from the file name if omitted
+
+    Yields:
+        dict: Product reduced to the fields the API consumes
+    """
+    fmt = fmt or detect_format(path)
+    with open_dump(path) as f:
+        if fmt == JSONL:
+            yield from _iter_jsonl(f)
+        elif fmt == CSV:
+            yield from _iter_csv(f)
+        else:
+            raise ValueError(f"Unsupported dump format: {fmt}")
+
+
+def _iter_jsonl(f: IO[str]) -> Iterator[dict]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            product = json_codec.loads(line)
+        except ValueError:
+            logger.warning("Skipping malformed JSON on line %d", line_number)
+            continue
+        if product.get("code") or product.get("_id"):
+            yield project_product(product)
+
+
+def _iter_csv(f: IO[str]) -> Iterator[dict]:
+    # Ingredient lists can exceed the default 128 KB field limit
+    csv.field_size_limit(sys.maxsize)
+    reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+    for row in reader:
+        code = row.get("code")
+        if code:
+            yield _csv_row_to_product(code, row)
+
+
+def _csv_row_to_product(code: str, row: dict) -> dict:
+    product = {"_id": code, "code": code}
+    for column in _CSV_TEXT_COLUMNS:
+        if row.get(column):
+            product[column] = row[column]
+    for column in _CSV_INT_COLUMNS:
+        value = _parse_number(row.get(column))
+        if value is not None:
+            product[column] = int(value)
+    for field, column in _CSV_TAG_COLUMNS.items():
+        if row.get(column):
+            product[field] = row[column].split(",")
+
+    nutriments = {}
+    for field in NUTRIMENT_FIELDS:
+        value = _parse_number(row.get(field))
+        if value is not None:
+            nutriments[field] = value
+    product["nutriments"] = nutriments
+    return product
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
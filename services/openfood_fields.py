@@ -0,0 +1,63 @@
+from typing import Tuple
+
+# Product fields read by read_product, ProductAnalysisService.analyze_product and
+# the alternatives index.
+# Everything else in an OpenFood product document is dropped before it is stored.
+PRODUCT_FIELDS: Tuple[str, ...] = (
+    "_id",
+    "code",
+    "product_name",
+    "brands",
+    "categories",
+    "categories_tags",
+    "countries",
+    "creator",
+    "image_url",
+    "image_ingredients_url",
+    "image_nutrition_url",
+    "ingredients_text",
+    "nutriscore_grade",
+    "nutriscore_score",
+    "nova_group",
+    "ecoscore_grade",
+    "ecoscore_score",
+    "allergens_tags",
+    "additives_tags",
+    "labels_tags",
+    "nutriments",
+    "last_modified_t",
+    "rev",
+)
+
+# Per-100g values read from the "nutriments" object
+NUTRIMENT_FIELDS: Tuple[str, ...] = (
+    "energy-kcal_100g",
+    "proteins_100g",
+    "carbohydrates_100g",
+    "sugars_100g",
+    "fat_100g",
+    "saturated-fat_100g",
+    "salt_100g",
+)
+
+
+def project_product(product: dict) -> dict:
+    """
+    Keep only the product fields the API consumes
+
+    Args:
+        product (dict): Full OpenFood product document
+
+    Returns:
+        dict: Product document reduced to PRODUCT_FIELDS and NUTRIMENT_FIELDS
+    """
+    projected = {field: product[field] for field in PRODUCT_FIELDS if field in product}
+    if "_id" not in projected and "code" in projected:
+        projected["_id"] = projected["code"]
+
+    nutriments = product.get("nutriments")
+    if isinstance(nutriments, dict):
+        projected["nutriments"] = {
+            field: nutriments[field] for field in NUTRIMENT_FIELDS if field in nutriments
+        }
+    return projected
@@ -1,45 +1,515 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Dict, Optional, Protocol, Sequence
+
 import httpx
 from fastapi import HTTPException
+from models.product_record import ProductRecord
 from config import get_settings
+from services import json_codec, metrics
+from services.barcode import InvalidBarcode, normalize_barcode
+from services.cache import FRESH, STALE, TTLCache
+from services.openfood_fields import PRODUCT_FIELDS
+from services.resilience import CircuitBreaker, LatencyTracker, RetryBudget, backoff_delay
+from services.single_flight import SingleFlight
+from services.upstream_scheduler import (
+    Priority, SchedulerRejected, SlotRequest, UpstreamScheduler, parse_retry_after
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Ask OpenFood for the consumed fields only instead of the full product document
+_FIELDS_PARAM = {"fields": ",".join(PRODUCT_FIELDS)}
+
+# Upstream answers that are worth retrying; 404 and other 4xx are final
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Approximate bytes held per negative cache entry
+_NOT_FOUND_ENTRY_SIZE = 64
+
+def _not_found(barcode: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=f"Product with barcode {barcode} not found"
+    )
+
+class ProductBackend(Protocol):
+    """Source of product information consulted before the live OpenFood API"""
+
+    async def get_product(self, barcode: str) -> Optional[dict]:
+        """Return product information shaped like an OpenFood API response, or None"""
+        ...
 
 class OpenFoodService:
-    @staticmethod
-    async def get_product(barcode: str) -> dict:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        cache: Optional[TTLCache] = None,
+        backends: Sequence[ProductBackend] = (),
+        not_found_cache: Optional[TTLCache] = None,
+    ):
         """
-        Fetch product information from OpenFood API
+        Args:
+            client (httpx.AsyncClient): Shared, pooled upstream client
+            cache (Optional[TTLCache]): Product cache in front of the upstream API
+            backends (Sequence[ProductBackend]): Local sources tried in order
+                on a cache miss before falling back to the upstream API
+            not_found_cache (Optional[TTLCache]): Barcodes the upstream API
+                recently reported as unknown
+        """
+        self.client = client
+        self.cache = cache
+        self.not_found_cache = not_found_cache
+        self.backends = list(backends)
+        self.flight = SingleFlight()
+        self.breaker = CircuitBreaker(
+            window=settings.OPENFOOD_BREAKER_WINDOW,
+            min_calls=settings.OPENFOOD_BREAKER_MIN_CALLS,
+            failure_rate_threshold=settings.OPENFOOD_BREAKER_FAILURE_RATE,
+            slow_call_threshold=settings.OPENFOOD_BREAKER_SLOW_CALL,
+            open_seconds=settings.OPENFOOD_BREAKER_OPEN_SECONDS,
+            half_open_calls=settings.OPENFOOD_BREAKER_HALF_OPEN_CALLS,
+        )
+        self.retry_budget = RetryBudget(
+            ratio=settings.OPENFOOD_RETRY_BUDGET_RATIO,
+            min_per_second=settings.OPENFOOD_RETRY_MIN_PER_SECOND,
+        )
+        self.scheduler = UpstreamScheduler(
+            rate=settings.OPENFOOD_RATE_LIMIT_PER_MINUTE / 60.0,
+            burst=settings.OPENFOOD_RATE_LIMIT_BURST,
+            max_queue=settings.OPENFOOD_QUEUE_MAX_SIZE,
+            max_wait={
+                Priority.INTERACTIVE: settings.OPENFOOD_QUEUE_MAX_WAIT_INTERACTIVE,
+                Priority.BACKGROUND: settings.OPENFOOD_QUEUE_MAX_WAIT_BACKGROUND,
+            },
+        )
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        # Scheduling class of every in-flight lookup, raised by joining callers
+        self._slot_requests: Dict[str, SlotRequest] = {}
+
+    @classmethod
+    def create_cache(cls) -> TTLCache:
+        """Create the product cache configured in Settings"""
+        return TTLCache(
+            max_entries=settings.PRODUCT_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PRODUCT_CACHE_MAX_BYTES,
+            ttl=settings.PRODUCT_CACHE_TTL,
+            stale_ttl=settings.PRODUCT_CACHE_STALE_TTL,
+        )
+
+    @classmethod
+    def create_not_found_cache(cls) -> TTLCache:
+        """Create the negative cache of unknown barcodes configured in Settings"""
+        return TTLCache(
+            max_entries=settings.NOT_FOUND_CACHE_MAX_ENTRIES,
+            max_bytes=settings.NOT_FOUND_CACHE_MAX_ENTRIES * _NOT_FOUND_ENTRY_SIZE,
+            ttl=settings.NOT_FOUND_CACHE_TTL,
+        )
+
+    async def get_product(self, barcode: str, priority: Priority = Priority.INTERACTIVE) -> ProductRecord:
+        """
+        Fetch product information, serving from the cache when possible
+
+        The barcode is normalized and its check digit verified first, so
+        invalid barcodes never reach the upstream API and every spelling of a
+        barcode shares the same cache entries.
+
+        Fresh cache entries are returned directly. Stale entries are returned
+        as well, while a background task refreshes them from the upstream API.
+        Barcodes the upstream recently reported as unknown get a 404 without a
+        new call. On a miss the local backends are tried before the upstream
+        API, and concurrent upstream lookups of the same barcode share a single
+        call. If the upstream is unavailable or rate-limits the lookup, any
+        cached copy is returned, however old.
         
         Args:
             barcode (str): Product barcode
+            priority (Priority): Upstream scheduling class of the lookup
             
         Returns:
-            dict: Product information
+            ProductRecord: Product information
             
         Raises:
-            HTTPException: If product is not found or API request fails
+            HTTPException: If the barcode is invalid, product is not found,
+            API request fails or times out
+        """
+        try:
+            barcode = normalize_barcode(barcode)
+        except InvalidBarcode as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        if self.cache is not None:
+            record, state = self.cache.get(barcode)
+            if state == FRESH:
+                return record
+            if state == STALE:
+                self._schedule_refresh(barcode)
+                return record
+
+        if self.not_found_cache is not None:
+            _, state = self.not_found_cache.get(barcode)
+            if state == FRESH:
+                raise _not_found(barcode)
+
+        for backend in self.backends:
+            with metrics.stage("local_store"):
+                data = await backend.get_product(barcode)
+            if data is not None:
+                return ProductRecord.from_product(data.get("product", {}), barcode)
+
+        try:
+            return await self._load(barcode, priority)
+        except HTTPException as e:
+            if (e.status_code >= 500 or e.status_code == 429) and self.cache is not None:
+                record = self.cache.peek(barcode)
+                if record is not None:
+                    self.fallbacks += 1
+                    return record
+            raise
+
+    async def get_known_product(self, barcode: str) -> Optional[ProductRecord]:
+        """
+        Look a product up in the product cache and the local backends only
+
+        Never calls the upstream API, and returns cached products however old.
+
+        Args:
+            barcode (str): Product barcode
+
+        Returns:
+            Optional[ProductRecord]: Product information, or None if the
+            product is not known locally
+
+        Raises:
+            HTTPException: If the barcode is invalid
+        """
+        try:
+            barcode = normalize_barcode(barcode)
+        except InvalidBarcode as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        if self.cache is not None:
+            record = self.cache.peek(barcode)
+            if record is not None:
+                return record
+
+        for backend in self.backends:
+            with metrics.stage("local_store"):
+                data = await backend.get_product(barcode)
+            if data is not None:
+                return ProductRecord.from_product(data.get("product", {}), barcode)
+        return None
+
+    async def refresh(self, barcode: str) -> bool:
+        """
+        Reload a cached product from the upstream API as background work
+
+        A product that no longer exists upstream is dropped from the cache.
+        Failures are logged rather than raised.
+
+        Args:
+            barcode (str): Canonical product barcode
+
+        Returns:
+            bool: True if the product was reloaded
+        """
+        try:
+            await self._load(barcode, Priority.BACKGROUND)
+        except HTTPException as e:
+            if e.status_code == 404 and self.cache is not None:
+                self.cache.delete(barcode)
+            logger.warning("Background refresh of %s failed: %s", barcode, e.detail)
+            return False
+        return True
+
+    def stats(self) -> dict:
+        """Return counters of the service components"""
+        return {
+            "product_cache": self.cache.stats() if self.cache is not None else None,
+            "not_found_cache": self.not_found_cache.stats() if self.not_found_cache is not None else None,
+            "single_flight": self.flight.stats(),
+            "refreshing": len(self._refresh_tasks),
+            "circuit_breaker": self.breaker.stats(),
+            "scheduler": self.scheduler.stats(),
+            "retry_budget": self.retry_budget.stats(),
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "stale_fallbacks": self.fallbacks,
+            "latency_p95": self.latency.p95(),
+        }
+
+    async def aclose(self) -> None:
+        """Cancel pending background refreshes and stop the upstream scheduler"""
+        tasks = list(self._refresh_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.scheduler.aclose()
+
+    async def _load(self, barcode: str, priority: Priority) -> ProductRecord:
+        """
+        Fetch through the shared in-flight call for this barcode, if any
+
+        A caller joining a call of a lower priority raises the call's
+        priority, so an interactive scan is never queued behind background
+        work because a batch or refresh asked for the same barcode first.
+
+        The shared call records its queue, upstream and decode stages in the
+        stage histogram only; every caller reports its own wait on it as the
+        upstream stage of its request.
+        """
+        request = self._slot_requests.get(barcode) if barcode in self.flight else None
+        if request is None:
+            request = SlotRequest(priority)
+            self._slot_requests[barcode] = request
+        else:
+            self.scheduler.promote(request, priority)
+        started = time.perf_counter()
+        try:
+            return await self.flight.do(
+                barcode,
+                lambda: self._fetch_and_store(barcode, request),
+                timeout=self._wait_timeout(priority),
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Timed out waiting for OpenFood API for barcode {barcode}"
+            )
+        finally:
+            metrics.record_request_stage("upstream", time.perf_counter() - started)
+            if barcode not in self.flight and self._slot_requests.get(barcode) is request:
+                del self._slot_requests[barcode]
+
+    def _wait_timeout(self, priority: Priority) -> float:
+        """
+        Seconds a caller of the given class waits on a lookup
+
+        At least OPENFOOD_WAIT_TIMEOUT, and long enough for a request that
+        waited the class's full queue time to be answered, so background
+        lookups are not cut short by the interactive bound.
+        """
+        return max(
+            settings.OPENFOOD_WAIT_TIMEOUT,
+            self.scheduler.max_wait[priority] + settings.OPENFOOD_READ_TIMEOUT,
+        )
+
+    async def _fetch_and_store(self, barcode: str, request: SlotRequest) -> ProductRecord:
+        try:
+            record = await self._fetch(barcode, request)
+        except HTTPException as e:
+            if e.status_code == 404 and self.not_found_cache is not None:
+                self.not_found_cache.set(barcode, True, _NOT_FOUND_ENTRY_SIZE)
+            raise
+        if self.not_found_cache is not None:
+            self.not_found_cache.delete(barcode)
+        if self.cache is not None:
+            self.cache.set(barcode, record, record.size())
+        return record
+
+    def _schedule_refresh(self, barcode: str) -> None:
+        if barcode in self._refresh_tasks:
+            return
+        # Background work must not record stages into the triggering request
+        task = contextvars.Context().run(asyncio.create_task, self.refresh(barcode))
+        self._refresh_tasks[barcode] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(barcode, None))
+
+    async def _fetch(self, barcode: str, request: SlotRequest) -> ProductRecord:
+        """
+        Fetch product information from OpenFood API with retries
+
+        Failed attempts with a retryable status are retried with jittered
+        exponential backoff, as long as the retry budget allows it. No attempt
+        is made while the circuit breaker is open, and every attempt waits for
+        a token from the rate-limit scheduler.
+
+        Args:
+            barcode (str): Product barcode
+            request (SlotRequest): Upstream scheduling class of the lookup,
+                raised when a caller of a higher class joins it
+
+        Returns:
+            ProductRecord: Product information
+
+        Raises:
+            HTTPException: If product is not found, API request fails, the
+            circuit breaker is open or no request slot is granted in time
         """
         url = settings.OPENFOOD_API_URL.format(barcode=barcode)
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get("status") != 1:
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"Product with barcode {barcode} not found"
-                    )
-                
-                return data
-            except httpx.RequestError as e:
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
                 raise HTTPException(
-                    status_code=500,
-                    detail=f"Network error occurred: {str(e)}"
+                    status_code=503,
+                    detail="OpenFood API is temporarily unavailable"
                 )
-            except httpx.HTTPStatusError as e:
-                raise HTTPException(
-                    status_code=e.response.status_code,
-                    detail=f"OpenFood API error: {str(e)}"
-                ) 
\ No newline at end of file
+            generation = self.breaker.generation
+            try:
+                with metrics.stage("queue"):
+                    await self.scheduler.acquire(request=request)
+            except SchedulerRejected as e:
+                self.breaker.release(generation)
+                raise HTTPException(status_code=503, detail=str(e))
+            except BaseException:
+                # Cancelled while queued, e.g. after the last waiter left
+                self.breaker.release(generation)
+                raise
+            try:
+                return await self._hedged_request(url, barcode, request, generation)
+            except HTTPException as e:
+                attempt += 1
+                if (
+                    e.status_code not in _RETRYABLE_STATUS_CODES
+                    or attempt >= settings.OPENFOOD_RETRY_MAX_ATTEMPTS
+                    or not self.retry_budget.withdraw()
+                ):
+                    raise
+            self.retries += 1
+            await asyncio.sleep(backoff_delay(
+                attempt, settings.OPENFOOD_RETRY_BACKOFF_BASE, settings.OPENFOOD_RETRY_BACKOFF_MAX
+            ))
+
+    async def _hedged_request(
+        self, url: str, barcode: str, request: SlotRequest, generation: int
+    ) -> ProductRecord:
+        """
+        Send a request, and a second one if the first is slower than usual
+
+        With hedging enabled, a duplicate request is sent once the first has
+        been running for the hedge delay (OPENFOOD_HEDGE_DELAY, or the observed
+        p95 latency), if the breaker, the retry budget and the scheduler allow
+        it without waiting. The first final answer wins and the other request
+        is cancelled.
+
+        Args:
+            generation (int): Breaker generation the first request was allowed in
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed_request(url, barcode, generation)
+
+        primary = asyncio.create_task(self._timed_request(url, barcode, generation))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.breaker.allow_request():
+                hedge_generation = self.breaker.generation
+                if not self.retry_budget.withdraw():
+                    self.breaker.release(hedge_generation)
+                elif not self.scheduler.try_acquire(request.priority):
+                    self.retry_budget.refund()
+                    self.breaker.release(hedge_generation)
+                else:
+                    pending.add(asyncio.create_task(self._timed_request(url, barcode, hedge_generation)))
+                    self.hedged += 1
+
+            error = None
+            while pending or done:
+                for task in done:
+                    e = task.exception()
+                    if e is None or not (
+                        isinstance(e, HTTPException) and e.status_code in _RETRYABLE_STATUS_CODES
+                    ):
+                        self.hedge_wins += task is not primary
+                        return task.result()
+                    error = e
+                done = set()
+                if pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not settings.OPENFOOD_HEDGE_ENABLED:
+            return None
+        if settings.OPENFOOD_HEDGE_DELAY is not None:
+            return settings.OPENFOOD_HEDGE_DELAY
+        p95 = self.latency.p95()
+        if p95 is None:
+            return None
+        return max(p95, settings.OPENFOOD_HEDGE_MIN_DELAY)
+
+    async def _timed_request(self, url: str, barcode: str, generation: int) -> ProductRecord:
+        """Run one upstream request and report its outcome to the breaker"""
+        started = time.monotonic()
+        try:
+            result = await self._request(url, barcode)
+        except HTTPException as e:
+            latency = time.monotonic() - started
+            self.breaker.record(e.status_code < 500 and e.status_code != 429, latency, generation)
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release(generation)
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started, generation)
+            raise
+        latency = time.monotonic() - started
+        self.breaker.record(True, latency, generation)
+        self.latency.observe(latency)
+        return result
+
+    async def _request(self, url: str, barcode: str) -> ProductRecord:
+        """
+        Fetch product information from OpenFood API
+
+        Only PRODUCT_FIELDS are requested, and the product is kept as a
+        compact ProductRecord rather than the decoded document.
+        
+        Args:
+            url (str): Product URL
+            barcode (str): Product barcode
+            
+        Returns:
+            ProductRecord: Product information
+            
+        Raises:
+            HTTPException: If product is not found or API request fails
+        """
+        try:
+            metrics.UPSTREAM_IN_FLIGHT.inc()
+            try:
+                with metrics.stage("upstream"):
+                    response = await self.client.get(url, params=_FIELDS_PARAM)
+            finally:
+                metrics.UPSTREAM_IN_FLIGHT.dec()
+            metrics.UPSTREAM_RESPONSES.inc(str(response.status_code))
+            response.raise_for_status()
+            with metrics.stage("decode"):
+                data = json_codec.loads(response.content)
+                found = data.get("status") == 1
+                if found:
+                    record = ProductRecord.from_product(data.get("product", {}), barcode)
+            
+            if not found:
+                raise _not_found(barcode)
+            
+            return record
+        except httpx.RequestError as e:
+            metrics.UPSTREAM_RESPONSES.inc("error")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Network error occurred: {str(e)}"
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (429, 503):
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    self.scheduler.pause(retry_after)
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail=f"OpenFood API error: {str(e)}"
+            )
@@ -1,7 +1,101 @@
-from typing import List, Dict, Tuple
+import hashlib
+import re
+from typing import List, Dict, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
 from models.product_analysis import ProductAnalysis
+from models.product_record import ProductRecord
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is only needed for bulk analysis
+    np = None
+
+# Placeholders rendered into descriptions while compiling the rating table
+_NAME_MARKER = "\x00name\x00"
+_COUNT_MARKER = "\x00count\x00"
+_TEMPLATE_SLOTS = re.compile(f"({re.escape(_NAME_MARKER)}|{re.escape(_COUNT_MARKER)})")
+_UNKNOWN_GRADE = "unknown"
+_UNKNOWN_NOVA_GROUP = 0
+
+class RatingRule(NamedTuple):
+    """Precomputed ratings for one combination of rating inputs"""
+    score: int
+    details: Dict[str, int]
+    health_rating: str
+    environmental_rating: str
+    # Description split around the product name and the additive count:
+    # (before name, after name, after count), the last one None without a count
+    template: Tuple[str, str, Optional[str]]
+
+    def describe(self, product_name: str, additives_count: int) -> str:
+        """Render the rating description for a product"""
+        before_name, after_name, after_count = self.template
+        if after_count is None:
+            return f"{before_name}{product_name}{after_name}"
+        return f"{before_name}{product_name}{after_name}{additives_count}{after_count}"
+
+def _split_description(description: str) -> Tuple[str, str, Optional[str]]:
+    """Split a description rendered with placeholders into a RatingRule template"""
+    parts = _TEMPLATE_SLOTS.split(description)
+    if len(parts) == 3 and parts[1] == _NAME_MARKER:
+        return parts[0], parts[2], None
+    if len(parts) == 5 and parts[1] == _NAME_MARKER and parts[3] == _COUNT_MARKER:
+        return parts[0], parts[2], parts[4]
+    raise ValueError(f"Unexpected rating description layout: {description!r}")
 
 class ProductAnalysisService:
+    _GRADES = ("a", "b", "c", "d", "e")
+    _NOVA_GROUPS = (1, 2, 3, 4)
+
+    # Rating score components (see _calculate_product_rating)
+    _NUTRI_POINTS = {
+        "a": 60,
+        "b": 45,
+        "c": 35,
+        "d": 20,
+        "e": 10
+    }
+    _NUTRI_POINTS_DEFAULT = 0
+    _NOVA_BONUS = {
+        1: 10,  # Unprocessed
+        2: 5,   # Processed ingredients
+        3: 0,   # Processed foods
+        4: -10  # Ultra-processed
+    }
+    _NOVA_BONUS_DEFAULT = 0
+    _ECO_PENALTY = {
+        "a": 0,
+        "b": -5,
+        "c": -7,
+        "d": -10,
+        "e": -15
+    }
+    _ECO_PENALTY_DEFAULT = -10
+    _ADDITIVES_BONUS = 10
+
+    # Health rating weights (see _determine_health_rating)
+    _NUTRI_HEALTH_WEIGHTS = {
+        "a": 3,
+        "b": 2,
+        "c": 1,
+        "d": 0,
+        "e": -1
+    }
+    _NOVA_HEALTH_WEIGHTS = {
+        1: 2,  # Unprocessed or minimally processed foods
+        2: 1,  # Processed culinary ingredients
+        3: 0,  # Processed foods
+        4: -1  # Ultra-processed foods
+    }
+
+    # Environmental rating weights (see _determine_environmental_rating)
+    _ECO_WEIGHTS = {
+        "a": 3,
+        "b": 2,
+        "c": 1,
+        "d": 0,
+        "e": -1
+    }
+
     @staticmethod
     def analyze_product(product_data: dict) -> ProductAnalysis:
         """
@@ -13,71 +107,170 @@ class ProductAnalysisService:
         Returns:
             ProductAnalysis: Analyzed product data with ratings
         """
-        # Extract basic information
-        product = product_data.get("product", {})
-        
-        # Extract nutritional values
-        nutriments = product.get("nutriments", {})
-        
-        # Determine health rating based on Nutri-Score and NOVA
-        nutri_score = product.get("nutriscore_grade", "e").lower()
-        nutri_score_points = product.get("nutriscore_score", 0)
-        nova_group = int(product.get("nova_group", 4))
-        
-        # Determine health rating
-        health_rating = ProductAnalysisService._determine_health_rating(
-            nutri_score, nutri_score_points, nova_group
-        )
-        
-        # Determine environmental rating
-        eco_score = product.get("ecoscore_grade", "e").lower()
-        eco_score_points = product.get("ecoscore_score", 0)
-        environmental_rating = ProductAnalysisService._determine_environmental_rating(
-            eco_score, eco_score_points
-        )
-        
-        # Extract allergens and additives
-        allergens = [tag for tag in product.get("allergens_tags", [])]
-        additives = [tag for tag in product.get("additives_tags", [])]
-        
-        # Extract labels
-        labels = [tag.replace("en:", "") for tag in product.get("labels_tags", [])]
+        record = ProductRecord.from_product(product_data.get("product", {}))
+        return ProductAnalysisService.analyze_record(record)
+
+    @staticmethod
+    def analyze_record(record: ProductRecord) -> ProductAnalysis:
+        """
+        Analyze a product record and determine health and environmental ratings
         
-        # Calculate product rating
-        rating_score, rating_details, rating_description = ProductAnalysisService._calculate_product_rating(
-            nutri_score=nutri_score,
-            additives=additives,
-            nova_group=nova_group,
-            eco_score=eco_score,
-            product_name=product.get("product_name", "")
-        )
+        Args:
+            record (ProductRecord): Product as held in the product cache
+            
+        Returns:
+            ProductAnalysis: Analyzed product data with ratings
+        """
+        # Look up the precomputed rating, health and environmental ratings
+        rule = ProductAnalysisService.rate_record(record)
+        rating_description = rule.describe(record.name, len(record.additives))
+        energy_kcal, proteins, carbohydrates, sugars, fat, saturated_fat, salt = record.nutriments
         
         return ProductAnalysis(
-            barcode=product.get("_id", ""),
-            name=product.get("product_name", ""),
-            brand=product.get("brands", ""),
-            nutri_score=nutri_score,
-            nutri_score_points=nutri_score_points,
-            nova_group=nova_group,
-            energy_kcal=nutriments.get("energy-kcal_100g", 0),
-            proteins=nutriments.get("proteins_100g", 0),
-            carbohydrates=nutriments.get("carbohydrates_100g", 0),
-            sugars=nutriments.get("sugars_100g", 0),
-            fat=nutriments.get("fat_100g", 0),
-            saturated_fat=nutriments.get("saturated-fat_100g", 0),
-            salt=nutriments.get("salt_100g", 0),
-            allergens=allergens,
-            additives=additives,
-            eco_score=eco_score,
-            eco_score_points=eco_score_points,
-            labels=labels,
-            rating_score=rating_score,
+            barcode=record.barcode,
+            name=record.name,
+            brand=record.brand,
+            nutri_score=record.nutri_score,
+            nutri_score_points=record.nutri_score_points,
+            nova_group=record.nova_group,
+            energy_kcal=energy_kcal,
+            proteins=proteins,
+            carbohydrates=carbohydrates,
+            sugars=sugars,
+            fat=fat,
+            saturated_fat=saturated_fat,
+            salt=salt,
+            allergens=record.allergens,
+            additives=record.additives,
+            eco_score=record.eco_score,
+            eco_score_points=record.eco_score_points,
+            labels=record.labels,
+            rating_score=rule.score,
             rating_description=rating_description,
-            rating_details=rating_details,
-            health_rating=health_rating,
-            environmental_rating=environmental_rating
+            rating_details=rule.details,
+            health_rating=rule.health_rating,
+            environmental_rating=rule.environmental_rating
         )
     
+    @staticmethod
+    def rate_record(record: ProductRecord) -> RatingRule:
+        """
+        Return the precomputed ratings of a product record, without analyzing it
+
+        Args:
+            record (ProductRecord): Product as held in the product cache
+
+        Returns:
+            RatingRule: rating_score, health and environmental ratings that
+            analyze_record reports for the product
+        """
+        return _RATING_TABLE[ProductAnalysisService._rating_index(
+            record.nutri_score, record.nova_group, record.eco_score, bool(record.additives)
+        )]
+
+    @staticmethod
+    def analyze_products(columns: Mapping[str, Sequence]) -> Dict[str, "np.ndarray"]:
+        """
+        Rate many products at once from columnar inputs using NumPy
+
+        Produces exactly the rating_score, health_rating and environmental_rating
+        that analyze_product computes for each product, which makes it suitable
+        for rescoring a whole catalog after the weights change.
+        
+        Args:
+            columns (Mapping[str, Sequence]): Equal-length columns
+                "nutri_score" (grades), "nova_group" (ints), "eco_score" (grades)
+                and "additives_count" (ints)
+            
+        Returns:
+            Dict[str, np.ndarray]: "rating_score" (ints), "health_rating" and
+            "environmental_rating" (strings), one value per product
+            
+        Raises:
+            RuntimeError: If NumPy is not installed
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for bulk product analysis")
+
+        service = ProductAnalysisService
+        nutri_code = service._encode_column(np.asarray(columns["nutri_score"]).astype(str), service._GRADES, ignore_case=True)
+        nova_code = service._encode_column(np.asarray(columns["nova_group"], dtype=np.int64), service._NOVA_GROUPS)
+        eco_code = service._encode_column(np.asarray(columns["eco_score"]).astype(str), service._GRADES, ignore_case=True)
+        has_additives = np.asarray(columns["additives_count"], dtype=np.int64) != 0
+
+        index = ((nutri_code * _NOVA_SLOTS + nova_code) * _GRADE_SLOTS + eco_code) * 2 + has_additives
+        return {
+            "rating_score": _RATING_ARRAYS["rating_score"][index],
+            "health_rating": _RATING_ARRAYS["health_rating"][index],
+            "environmental_rating": _RATING_ARRAYS["environmental_rating"][index],
+        }
+
+    @staticmethod
+    def _encode_column(values: "np.ndarray", keys: Sequence, ignore_case: bool = False) -> "np.ndarray":
+        """Return the position of every value in keys, or len(keys) for unknown values"""
+        spellings = {key: code for code, key in enumerate(keys)}
+        if ignore_case:
+            # Grade keys are single ASCII letters, so their upper-case spelling is
+            # the only other string that str.lower() maps onto them
+            spellings.update({key.upper(): code for code, key in enumerate(keys)})
+        sorted_spellings = np.array(sorted(spellings))
+        codes = np.array([spellings[spelling] for spelling in sorted_spellings.tolist()], dtype=np.int64)
+        index = np.minimum(np.searchsorted(sorted_spellings, values), len(sorted_spellings) - 1)
+        return np.where(sorted_spellings[index] == values, codes[index], len(keys))
+
+    @staticmethod
+    def _rating_index(nutri_score: str, nova_group: int, eco_score: str, has_additives: bool) -> int:
+        """Return the position of a rating input combination in the rating table"""
+        nutri_code = _GRADE_CODES.get(nutri_score, len(_GRADE_CODES))
+        nova_code = _NOVA_CODES.get(nova_group, len(_NOVA_CODES))
+        eco_code = _GRADE_CODES.get(eco_score, len(_GRADE_CODES))
+        return ((nutri_code * _NOVA_SLOTS + nova_code) * _GRADE_SLOTS + eco_code) * 2 + has_additives
+
+    @staticmethod
+    def _compile_rating_table() -> List[RatingRule]:
+        """
+        Evaluate the scoring rules once for every possible input combination
+
+        Ratings only depend on the Nutri-Score grade, the NOVA group, the
+        Eco-Score grade and whether the product has additives. Any value
+        outside the known grades and groups is rated the same way, so one
+        extra "unknown" slot per input covers the whole domain. Descriptions
+        are rendered with placeholders for the product name and additive count
+        and split around them.
+        """
+        service = ProductAnalysisService
+        table = []
+        for nutri_score in service._GRADES + (_UNKNOWN_GRADE,):
+            for nova_group in service._NOVA_GROUPS + (_UNKNOWN_NOVA_GROUP,):
+                for eco_score in service._GRADES + (_UNKNOWN_GRADE,):
+                    for additives_count in (0, _COUNT_MARKER):
+                        score, details, _ = service._calculate_product_rating(
+                            nutri_score=nutri_score,
+                            additives=["additive"] if additives_count else [],
+                            nova_group=nova_group,
+                            eco_score=eco_score,
+                            product_name=""
+                        )
+                        description = service._generate_rating_description(
+                            product_name=_NAME_MARKER,
+                            total_score=score,
+                            nutri_score=nutri_score,
+                            additives_count=additives_count,
+                            nova_group=nova_group,
+                            eco_score=eco_score
+                        )
+                        table.append(RatingRule(
+                            score=score,
+                            details=details,
+                            health_rating=service._determine_health_rating(nutri_score, 0, nova_group),
+                            environmental_rating=service._determine_environmental_rating(eco_score, 0),
+                            template=_split_description(description),
+                        ))
+        return table
+    
+    # The helpers below are the reference scoring rules. analyze_product and
+    # analyze_products read their results from _RATING_TABLE, compiled at import.
+
     @staticmethod
     def _calculate_product_rating(
         nutri_score: str,
@@ -93,34 +286,22 @@ class ProductAnalysisService:
             Tuple[int, Dict, str]: (total_score, score_details, description)
         """
         # 1. Nutri-Score points (0-60)
-        nutri_weights = {
-            "a": 60,
-            "b": 45,
-            "c": 35,
-            "d": 20,
-            "e": 10
-        }
-        nutri_points = nutri_weights.get(nutri_score.lower(), 0)
+        nutri_points = ProductAnalysisService._NUTRI_POINTS.get(
+            nutri_score.lower(), ProductAnalysisService._NUTRI_POINTS_DEFAULT
+        )
         
         # 2. Additives bonus (+10 if no additives)
-        additives_bonus = 10 if not additives else 0
+        additives_bonus = ProductAnalysisService._ADDITIVES_BONUS if not additives else 0
         
         # 3. NOVA bonus (0-10)
-        nova_bonus = {
-            1: 10,  # Unprocessed
-            2: 5,   # Processed ingredients
-            3: 0,   # Processed foods
-            4: -10  # Ultra-processed
-        }.get(nova_group, 0)
+        nova_bonus = ProductAnalysisService._NOVA_BONUS.get(
+            nova_group, ProductAnalysisService._NOVA_BONUS_DEFAULT
+        )
         
         # 4. Eco-Score penalty (-10 to 0)
-        eco_penalty = {
-            "a": 0,
-            "b": -5,
-            "c": -7,
-            "d": -10,
-            "e": -15
-        }.get(eco_score.lower(), -10)
+        eco_penalty = ProductAnalysisService._ECO_PENALTY.get(
+            eco_score.lower(), ProductAnalysisService._ECO_PENALTY_DEFAULT
+        )
         
         # Calculate total score
         total_score = max(0, min(100, 
@@ -143,7 +324,7 @@ class ProductAnalysisService:
             product_name=product_name,
             total_score=total_score,
             nutri_score=nutri_score,
-            additives=additives,
+            additives_count=len(additives),
             nova_group=nova_group,
             eco_score=eco_score
         )
@@ -155,11 +336,17 @@ class ProductAnalysisService:
         product_name: str,
         total_score: int,
         nutri_score: str,
-        additives: List[str],
+        additives_count: Union[int, str],
         nova_group: int,
         eco_score: str
     ) -> str:
-        """Generate a human-readable description of the product rating"""
+        """
+        Generate a human-readable description of the product rating
+
+        The product name and the additive count are rendered as given, so
+        the rating table can render placeholder strings in their place; a
+        placeholder count stands for a product with additives.
+        """
         # Determine rating level
         if total_score >= 70:
             rating_level = "высокую"
@@ -175,7 +362,7 @@ class ProductAnalysisService:
         pros = []
         if nutri_score in ["a", "b"]:
             pros.append(f"хороший Nutri-Score ({nutri_score.upper()})")
-        if not additives:
+        if not additives_count:
             pros.append("отсутствие добавок")
         if nova_group == 1:
             pros.append("минимальная обработка (NOVA 1)")
@@ -189,8 +376,8 @@ class ProductAnalysisService:
         cons = []
         if nutri_score in ["d", "e"]:
             cons.append(f"низкий Nutri-Score ({nutri_score.upper()})")
-        if additives:
-            cons.append(f"наличие добавок ({len(additives)} шт.)")
+        if additives_count:
+            cons.append(f"наличие добавок ({additives_count} шт.)")
         if nova_group == 4:
             cons.append("высокая степень обработки (NOVA 4)")
         if eco_score in ["d", "e"]:
@@ -204,25 +391,10 @@ class ProductAnalysisService:
     @staticmethod
     def _determine_health_rating(nutri_score: str, nutri_points: int, nova_group: int) -> str:
         """Determine overall health rating based on Nutri-Score and NOVA classification"""
-        # Nutri-Score weights
-        nutri_weights = {
-            "a": 3,
-            "b": 2,
-            "c": 1,
-            "d": 0,
-            "e": -1
-        }
-        
-        # NOVA weights (lower is better)
-        nova_weights = {
-            1: 2,  # Unprocessed or minimally processed foods
-            2: 1,  # Processed culinary ingredients
-            3: 0,  # Processed foods
-            4: -1  # Ultra-processed foods
-        }
-        
-        # Calculate weighted score
-        score = nutri_weights.get(nutri_score, 0) + nova_weights.get(nova_group, 0)
+        score = (
+            ProductAnalysisService._NUTRI_HEALTH_WEIGHTS.get(nutri_score, 0) +
+            ProductAnalysisService._NOVA_HEALTH_WEIGHTS.get(nova_group, 0)
+        )
         
         if score >= 4:
             return "good"
@@ -234,20 +406,31 @@ class ProductAnalysisService:
     @staticmethod
     def _determine_environmental_rating(eco_score: str, eco_points: int) -> str:
         """Determine environmental rating based on Eco-Score"""
-        # Eco-Score weights
-        eco_weights = {
-            "a": 3,
-            "b": 2,
-            "c": 1,
-            "d": 0,
-            "e": -1
-        }
-        
-        score = eco_weights.get(eco_score, 0)
+        score = ProductAnalysisService._ECO_WEIGHTS.get(eco_score, 0)
         
         if score >= 2:
             return "good"
         elif score >= 0:
             return "moderate"
         else:
-            return "poor" 
\ No newline at end of file
+            return "poor"
+
+
+_GRADE_CODES = {grade: code for code, grade in enumerate(ProductAnalysisService._GRADES)}
+_NOVA_CODES = {group: code for code, group in enumerate(ProductAnalysisService._NOVA_GROUPS)}
+_GRADE_SLOTS = len(_GRADE_CODES) + 1
+_NOVA_SLOTS = len(_NOVA_CODES) + 1
+
+_RATING_TABLE = ProductAnalysisService._compile_rating_table()
+
+# Identifies the scoring rules; changes whenever any rating output changes,
+# which invalidates analysis results cached under the previous rules
+RULES_VERSION = hashlib.sha256(repr(_RATING_TABLE).encode("utf-8")).hexdigest()[:16]
+
+_RATING_ARRAYS = None
+if np is not None:
+    _RATING_ARRAYS = {
+        "rating_score": np.array([rule.score for rule in _RATING_TABLE], dtype=np.int64),
+        "health_rating": np.array([rule.health_rating for rule in _RATING_TABLE]),
+        "environmental_rating": np.array([rule.environmental_rating for rule in _RATING_TABLE]),
+    }
@@ -0,0 +1,272 @@
+import hashlib
+from typing import Hashable, Optional
+
+from fastapi import HTTPException
+from config import get_settings
+from models.alternatives import Alternative, AlternativesResponse
+from models.product import Product
+from models.product_record import ProductRecord
+from models.product_response import ProductResponse
+from services import metrics
+from services.alternatives_index import AlternativesIndex
+from services.barcode import canonical_or_raw
+from services.cache import FRESH, TTLCache
+from services.image_service import proxy_image_url
+from services.openfood_service import OpenFoodService
+from services.product_analysis_service import RULES_VERSION, ProductAnalysisService
+from services.upstream_scheduler import Priority
+
+settings = get_settings()
+
+# Responses depend on the scoring rules and, when they are rewritten, on the
+# image proxy URLs; cached analyses and ETags from other settings must not match
+_RESPONSE_VERSION = (
+    f"{RULES_VERSION}+images:{settings.IMAGE_PROXY_BASE_URL}"
+    if settings.IMAGE_PROXY_REWRITE_URLS else RULES_VERSION
+)
+
+
+def _digest_etag(data: bytes) -> str:
+    """Return a quoted strong ETag derived from ``data``"""
+    return '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+
+
+class AnalyzedProduct:
+    """
+    Serialized product information and analysis, with its ETag
+
+    Only the JSON body is kept, so the analysis cache is charged for the
+    memory an entry actually holds.
+    """
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+
+
+class ProductService:
+    """
+    Fetch products and build their analysis, memoizing the result
+
+    Analysis results are cached by (barcode, OpenFood revision, scoring rules
+    version), so an unchanged product is analyzed, validated and serialized
+    only once. Products without revision information are analyzed every time.
+    Products are added to the alternatives index when they are analyzed;
+    cached analyses were added when they were made.
+    """
+
+    def __init__(
+        self,
+        openfood_service: OpenFoodService,
+        cache: Optional[TTLCache] = None,
+        alternatives: Optional[AlternativesIndex] = None,
+    ):
+        """
+        Args:
+            openfood_service (OpenFoodService): Upstream product source
+            cache (Optional[TTLCache]): Cache of AnalyzedProduct results
+            alternatives (Optional[AlternativesIndex]): Index of the best rated
+                products per category
+        """
+        self.openfood_service = openfood_service
+        self.cache = cache
+        self.alternatives = alternatives
+
+    @classmethod
+    def create_alternatives_index(cls) -> AlternativesIndex:
+        """Create the alternatives index configured in Settings"""
+        return AlternativesIndex(settings.ALTERNATIVES_PER_CATEGORY)
+
+    @classmethod
+    def create_cache(cls) -> TTLCache:
+        """Create the analysis cache configured in Settings"""
+        # Entries are keyed by revision and never go stale, only evicted
+        return TTLCache(
+            max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+            ttl=float("inf"),
+        )
+
+    async def get_product(self, barcode: str, priority: Priority = Priority.INTERACTIVE) -> AnalyzedProduct:
+        """
+        Fetch a product and return its analysis
+
+        Args:
+            barcode (str): Product barcode
+            priority (Priority): Upstream scheduling class of the lookup
+
+        Returns:
+            AnalyzedProduct: Serialized product information and analysis, and its ETag
+
+        Raises:
+            HTTPException: If product is not found or API request fails
+        """
+        record = await self.get_product_record(barcode, priority)
+        return self.analyze(record)
+
+    async def get_product_record(self, barcode: str, priority: Priority = Priority.INTERACTIVE) -> ProductRecord:
+        """
+        Fetch product information, without analyzing it
+
+        Lets callers check etag() before paying for the analysis.
+
+        Args:
+            barcode (str): Product barcode
+            priority (Priority): Upstream scheduling class of the lookup
+
+        Returns:
+            ProductRecord: Product information from OpenFoodService
+
+        Raises:
+            HTTPException: If product is not found or API request fails
+        """
+        return await self.openfood_service.get_product(barcode, priority)
+
+    def analyze(self, record: ProductRecord) -> AnalyzedProduct:
+        """
+        Analyze a product, reusing a cached result for the same revision
+
+        Args:
+            record (ProductRecord): Product information from OpenFoodService
+
+        Returns:
+            AnalyzedProduct: Serialized product information and analysis, and its ETag
+        """
+        key = self.cache_key(record)
+        if key is not None and self.cache is not None:
+            analyzed, state = self.cache.get(key)
+            if state == FRESH:
+                return analyzed
+
+        with metrics.stage("analyze"):
+            response = self.build_response(record)
+        with metrics.stage("serialize"):
+            body = response.model_dump_json().encode("utf-8")
+        # Without a revision the body itself identifies the response
+        etag = _digest_etag(repr(key).encode("utf-8") if key is not None else body)
+        analyzed = AnalyzedProduct(body, etag)
+        if key is not None and self.cache is not None:
+            self.cache.set(key, analyzed, len(analyzed.body))
+        if self.alternatives is not None:
+            analysis = response.analysis
+            self.alternatives.add(record, analysis.rating_score, analysis.health_rating)
+        return analyzed
+
+    async def get_alternatives(self, barcode: str, limit: int) -> AlternativesResponse:
+        """
+        Return higher-rated products of the same categories as a product
+
+        Only locally known products are considered: the product itself is
+        read from the product cache or the local store, and alternatives come
+        from the alternatives index, so the upstream API is never called.
+
+        Args:
+            barcode (str): Product barcode
+            limit (int): Maximum number of alternatives
+
+        Returns:
+            AlternativesResponse: Product rating and its alternatives, most
+            specific category first, then best rated first
+
+        Raises:
+            HTTPException: If the barcode is invalid or the product is not
+            known locally
+        """
+        record = await self.openfood_service.get_known_product(barcode)
+        if record is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Product with barcode {barcode} is not known yet"
+            )
+        rule = ProductAnalysisService.rate_record(record)
+        found = []
+        if self.alternatives is not None:
+            self.alternatives.add(record, rule.score, rule.health_rating)
+            with metrics.stage("alternatives"):
+                found = self.alternatives.alternatives(
+                    canonical_or_raw(record.barcode), record.categories, rule.score, limit
+                )
+        return AlternativesResponse(
+            barcode=canonical_or_raw(record.barcode),
+            rating_score=rule.score,
+            alternatives=[
+                Alternative(
+                    barcode=product.barcode,
+                    name=product.name,
+                    brand=product.brand,
+                    image=proxy_image_url(product.image),
+                    category=category,
+                    nutri_score=product.nutri_score,
+                    rating_score=product.rating_score,
+                    health_rating=product.health_rating,
+                )
+                for product, category in found
+            ],
+        )
+
+    def stats(self) -> dict:
+        """Return counters of the service and of the upstream service"""
+        return {
+            "analysis_cache": self.cache.stats() if self.cache is not None else None,
+            "alternatives_index": self.alternatives.stats() if self.alternatives is not None else None,
+            **self.openfood_service.stats(),
+        }
+
+    @staticmethod
+    def cache_key(record: ProductRecord) -> Optional[Hashable]:
+        """
+        Return the analysis cache key of a product
+
+        Args:
+            record (ProductRecord): Product information from OpenFoodService
+
+        Returns:
+            Optional[Hashable]: (barcode, last_modified_t, rev, response version), or
+            None if the product carries no revision information
+        """
+        revision = record.revision()
+        if revision is None:
+            return None
+        return (record.barcode, *revision, _RESPONSE_VERSION)
+
+    @classmethod
+    def etag(cls, record: ProductRecord) -> Optional[str]:
+        """
+        Return the strong ETag of a product's response, without analyzing it
+
+        The response body is fully determined by the product revision, the
+        scoring rules version and the image URL settings, so the ETag is
+        derived from the analysis cache key.
+
+        Args:
+            record (ProductRecord): Product information from OpenFoodService
+
+        Returns:
+            Optional[str]: Quoted ETag, or None if the product carries no
+            revision information and only its analyzed body can identify it
+        """
+        key = cls.cache_key(record)
+        if key is None:
+            return None
+        return _digest_etag(repr(key).encode("utf-8"))
+
+    @staticmethod
+    def build_response(record: ProductRecord) -> ProductResponse:
+        """Build the product information and analysis from a product record"""
+        product = Product(
+            barcode=record.barcode,
+            brand=record.brand,
+            category=record.category,
+            country=record.country,
+            creator=record.creator,
+            image=proxy_image_url(record.image),
+            image_ingredients=proxy_image_url(record.image_ingredients),
+            image_nutritions=proxy_image_url(record.image_nutritions),
+            ingredients=record.ingredients,
+        )
+        
+        analysis = ProductAnalysisService.analyze_record(record)
+        
+        return ProductResponse(product=product, analysis=analysis)
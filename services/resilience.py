@@ -0,0 +1,266 @@
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Latency-aware circuit breaker
+
+    Outcomes of the most recent calls are kept in a rolling window. A call is
+    bad if it failed or took longer than ``slow_call_threshold``. Once the
+    window holds at least ``min_calls`` outcomes and the share of bad ones
+    reaches ``failure_rate_threshold``, the breaker opens and rejects calls for
+    ``open_seconds``. It then lets ``half_open_calls`` trial calls through:
+    if they all succeed it closes again, otherwise it reopens.
+
+    Every state change starts a new generation. Callers pass the generation
+    they were admitted in to record() and release(), so a call that started
+    before a change and finishes after it does not count as a trial call.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_threshold: float,
+        open_seconds: float,
+        half_open_calls: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._bad = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self._generation = 0
+
+        self.opened = 0
+        self.rejected = 0
+        self.slow_calls = 0
+        self.failed_calls = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials_started = 0
+            self._trials_succeeded = 0
+            self._generation += 1
+        return self._state
+
+    @property
+    def generation(self) -> int:
+        """Number of state changes so far; read it right after allow_request()"""
+        # Apply a pending change from open to half-open first
+        self.state
+        return self._generation
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go upstream now
+
+        Returns:
+            bool: False if the breaker is open or out of half-open trial calls
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._trials_started < self.half_open_calls:
+            self._trials_started += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, latency: float, generation: Optional[int] = None) -> None:
+        """
+        Record the outcome of an allowed call
+
+        Args:
+            success (bool): Whether the upstream answered without failing
+            latency (float): Call duration in seconds
+            generation (Optional[int]): Generation the call was allowed in;
+                outcomes of earlier generations only update the counters
+        """
+        slow = latency > self.slow_call_threshold
+        self.slow_calls += slow
+        self.failed_calls += not success
+        good = success and not slow
+        if generation is not None and generation != self.generation:
+            return
+
+        if self._state == HALF_OPEN:
+            if not good:
+                self._open()
+                return
+            self._trials_succeeded += 1
+            if self._trials_succeeded >= self.half_open_calls:
+                self._close()
+            return
+
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._bad -= not self._outcomes[0]
+        self._outcomes.append(good)
+        self._bad += not good
+        if (
+            self._state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and self._bad / len(self._outcomes) >= self.failure_rate_threshold
+        ):
+            self._open()
+
+    def release(self, generation: Optional[int] = None) -> None:
+        """
+        Give back a half-open trial slot of a call that was cancelled
+
+        Args:
+            generation (Optional[int]): Generation the call was allowed in;
+                slots of earlier generations are not given back
+        """
+        if generation is not None and generation != self.generation:
+            return
+        if self._state == HALF_OPEN and self._trials_started > self._trials_succeeded:
+            self._trials_started -= 1
+
+    def stats(self) -> Dict[str, object]:
+        """Return state, recent failure rate and counters"""
+        return {
+            "state": self.state,
+            "failure_rate": self._bad / len(self._outcomes) if self._outcomes else 0.0,
+            "window_calls": len(self._outcomes),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "slow_calls": self.slow_calls,
+            "failed_calls": self.failed_calls,
+        }
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._generation += 1
+        self.opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._generation += 1
+        self._outcomes.clear()
+        self._bad = 0
+
+
+class RetryBudget:
+    """
+    Bound retries to a share of the request rate
+
+    Every request deposits ``ratio`` tokens and every retry (or hedged request)
+    withdraws one. ``min_per_second`` tokens are also added over time so that
+    a low request rate can still retry. The balance is capped at ``capacity``.
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        min_per_second: float,
+        capacity: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+        self.withdrawn = 0
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        """Record a request"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Take a token for a retry
+
+        Returns:
+            bool: False if the budget is exhausted and the retry must be skipped
+        """
+        self._refill()
+        if self._tokens < 1.0:
+            self.exhausted += 1
+            return False
+        self._tokens -= 1.0
+        self.withdrawn += 1
+        return True
+
+    def refund(self) -> None:
+        """Give back a token withdrawn for a retry that was not sent after all"""
+        self._tokens = min(self.capacity, self._tokens + 1.0)
+        self.withdrawn -= 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return the current balance and counters"""
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 3),
+            "withdrawn": self.withdrawn,
+            "exhausted": self.exhausted,
+        }
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+
+class LatencyTracker:
+    """Keep recent call latencies and report a percentile of them"""
+
+    def __init__(self, size: int = 256, min_samples: int = 20, recompute_every: int = 16):
+        self.min_samples = min_samples
+        self.recompute_every = recompute_every
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._since_recompute = 0
+        self._p95: Optional[float] = None
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._since_recompute += 1
+
+    def p95(self) -> Optional[float]:
+        """Return the 95th percentile latency, or None with too few samples"""
+        if len(self._samples) < self.min_samples:
+            return None
+        if self._p95 is None or self._since_recompute >= self.recompute_every:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self._since_recompute = 0
+        return self._p95
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Return a full-jitter exponential backoff delay
+
+    Args:
+        attempt (int): Number of attempts made so far (1 for the first retry)
+        base (float): Delay scale in seconds
+        cap (float): Maximum delay in seconds
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
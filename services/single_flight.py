@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one shared task
+
+    The first caller for a key starts the task; callers arriving while it is
+    in flight wait on the same task and receive the same result or exception.
+    Each waiter can give up on its own (timeout or cancellation) without
+    affecting the others. When the last waiter leaves, the task is cancelled.
+
+    The task runs in an empty context, so it does not write to per-request
+    state (such as stage timings) of the caller that happened to start it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Run ``fn`` once per key among concurrent callers
+
+        Args:
+            key (Hashable): Key identifying the call
+            fn (Callable[[], Awaitable[Any]]): Coroutine factory for the call
+            timeout (Optional[float]): Seconds this caller waits at most
+
+        Returns:
+            Any: Result of the shared call
+
+        Raises:
+            asyncio.TimeoutError: If this caller waited longer than ``timeout``
+            Exception: Whatever the shared call raised
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(contextvars.Context().run(asyncio.create_task, fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Callers arriving while the task unwinds must start a new
+                # call rather than join one that is being cancelled
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """Return in-flight, started, coalesced and timeout counters"""
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter has already left
+        if not call.task.cancelled():
+            call.task.exception()
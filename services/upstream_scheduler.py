@@ -0,0 +1,281 @@
+import asyncio
+import heapq
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Callable, Dict, List, Mapping, Optional
+
+# Longest pause accepted from a Retry-After header, in seconds
+_MAX_RETRY_AFTER = 300.0
+
+
+class Priority(IntEnum):
+    """Upstream request classes; lower values are served first"""
+    INTERACTIVE = 0  # scans from read_product
+    BACKGROUND = 1  # batch lookups, prefetch and cache refresh
+
+
+class SchedulerRejected(Exception):
+    """Raised when an upstream request slot cannot be granted in time"""
+
+
+class SlotRequest:
+    """
+    Priority of a lookup that may be raised while it waits for a slot
+
+    Passed to UpstreamScheduler.acquire(); promote() then moves the queued
+    request ahead, e.g. when an interactive scan joins a background lookup.
+    """
+
+    __slots__ = ("priority", "_entry")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self._entry: Optional[list] = None
+
+
+class UpstreamScheduler:
+    """
+    Token-bucket pacing of upstream requests with priority classes
+
+    Tokens accrue at ``rate`` per second up to ``burst``. A request takes a
+    token immediately when one is free and nobody is queued, otherwise it waits
+    in a priority queue: queued interactive requests are always granted before
+    background ones. The queue is bounded by ``max_queue`` and every class has
+    a maximum wait, after which the request is rejected. A ``Retry-After`` from
+    the upstream empties the bucket and pauses granting until it has passed.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_queue: int,
+        max_wait: Mapping[Priority, float],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (float): Bucket capacity
+            max_queue (int): Maximum number of queued requests
+            max_wait (Mapping[Priority, float]): Seconds a request of each class may wait
+            clock (Callable[[], float]): Monotonic time source
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = dict(max_wait)
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        # Entries are [priority, sequence, future] lists so promote() can update them
+        self._queue: List[list] = []
+        self._sequence = itertools.count()
+        self._waiting: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.granted = {priority: 0 for priority in Priority}
+        self.rejected = {priority: 0 for priority in Priority}
+        self.timeouts = {priority: 0 for priority in Priority}
+        self.waited = {priority: 0.0 for priority in Priority}
+        self.max_waited = {priority: 0.0 for priority in Priority}
+        self.pauses = 0
+
+    def try_acquire(self, priority: Priority) -> bool:
+        """
+        Take a token only if one is free right now and nobody of the same or
+        a higher priority is queued
+
+        Returns:
+            bool: Whether a token was taken
+        """
+        if any(self._waiting[p] for p in Priority if p <= priority):
+            return False
+        self._refill()
+        if self._clock() < self._paused_until or self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        self.granted[priority] += 1
+        return True
+
+    async def acquire(
+        self, priority: Priority = Priority.INTERACTIVE, request: Optional[SlotRequest] = None
+    ) -> None:
+        """
+        Wait for a token
+
+        Args:
+            priority (Priority): Request class
+            request (Optional[SlotRequest]): Handle through which promote()
+                can raise the priority while the request is queued; its
+                priority is used instead of ``priority``
+
+        Raises:
+            SchedulerRejected: If the queue is full or the wait exceeded the
+            maximum for the class the request was queued in
+        """
+        if request is not None:
+            priority = request.priority
+        if self.try_acquire(priority):
+            return
+        if sum(self._waiting.values()) >= self.max_queue:
+            self.rejected[priority] += 1
+            raise SchedulerRejected("Upstream request queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._queue, entry)
+        self._waiting[priority] += 1
+        if request is not None:
+            request._entry = entry
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        started = self._clock()
+        max_wait = self.max_wait.get(priority)
+        # The timeout settles the future itself, so it cannot race a grant
+        expiry = None
+        if max_wait is not None:
+            expiry = asyncio.get_running_loop().call_later(max_wait, self._expire, entry)
+        try:
+            await future
+        except BaseException:
+            # Cancelled after the token was granted but before resuming
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._give_back()
+            raise
+        finally:
+            if expiry is not None:
+                expiry.cancel()
+            if request is not None:
+                request._entry = None
+            # A promoted request is accounted to the class it ended up in
+            priority = entry[0]
+            self._waiting[priority] -= 1
+            waited = self._clock() - started
+            self.waited[priority] += waited
+            self.max_waited[priority] = max(self.max_waited[priority], waited)
+        self.granted[priority] += 1
+
+    def promote(self, request: SlotRequest, priority: Priority) -> None:
+        """
+        Raise the priority of a request, moving it ahead if it is queued
+
+        The request keeps the maximum wait of the class it was queued in.
+
+        Args:
+            request (SlotRequest): Request to promote
+            priority (Priority): New class; ignored unless higher than the current one
+        """
+        if priority >= request.priority:
+            return
+        request.priority = priority
+        entry = request._entry
+        if entry is not None and not entry[2].done():
+            self._waiting[entry[0]] -= 1
+            self._waiting[priority] += 1
+            entry[0] = priority
+            heapq.heapify(self._queue)
+
+    async def aclose(self) -> None:
+        """Reject the queued requests and stop the dispatcher task"""
+        for entry in self._queue:
+            if not entry[2].done():
+                entry[2].set_exception(SchedulerRejected("Upstream scheduler is closed"))
+        self._queue.clear()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop granting tokens for a while, e.g. after a 429 with Retry-After
+
+        Args:
+            seconds (float): Pause length in seconds, capped at five minutes
+        """
+        self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, self._clock() + min(seconds, _MAX_RETRY_AFTER))
+        self.pauses += 1
+
+    def stats(self) -> dict:
+        """Return bucket state and per-class queue depth, waits and counters"""
+        self._refill()
+        classes = {}
+        for priority in Priority:
+            granted = self.granted[priority]
+            classes[priority.name.lower()] = {
+                "queued": self._waiting[priority],
+                "granted": granted,
+                "rejected": self.rejected[priority],
+                "timeouts": self.timeouts[priority],
+                "avg_wait": self.waited[priority] / granted if granted else 0.0,
+                "max_wait": self.max_waited[priority],
+            }
+        return {
+            "tokens": round(self._tokens, 3),
+            "paused_for": max(0.0, self._paused_until - self._clock()),
+            "pauses": self.pauses,
+            "classes": classes,
+        }
+
+    async def _dispatch(self) -> None:
+        """Grant tokens to queued requests in priority order as they accrue"""
+        try:
+            while True:
+                while self._queue and self._queue[0][2].done():
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    return
+                self._refill()
+                now = self._clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    heapq.heappop(self._queue)[2].set_result(None)
+                else:
+                    await asyncio.sleep((1.0 - self._tokens) / self.rate)
+        finally:
+            self._dispatcher = None
+
+    def _expire(self, entry: list) -> None:
+        if not entry[2].done():
+            self.timeouts[entry[0]] += 1
+            entry[2].set_exception(SchedulerRejected("Timed out waiting for an upstream request slot"))
+
+    def _give_back(self) -> None:
+        """Return a granted token that its request did not use"""
+        self._refill()
+        self._tokens = min(self.burst, self._tokens + 1.0)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if now > self._paused_until:
+            start = max(self._updated_at, self._paused_until)
+            self._tokens = min(self.burst, self._tokens + (now - start) * self.rate)
+        self._updated_at = now
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
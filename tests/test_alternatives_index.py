@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from models.product_record import ProductRecord
+from services.alternatives_index import AlternativesIndex
+
+
+def _record(barcode, categories=("en:spreads",)):
+    return ProductRecord.from_product({
+        "_id": barcode,
+        "product_name": f"Product {barcode}",
+        "categories_tags": list(categories),
+    })
+
+
+def _add(index, barcode, score, categories=("en:spreads",)):
+    index.add(_record(barcode, categories), score, "moderate")
+
+
+def _barcodes(found):
+    return [product.barcode for product, _ in found]
+
+
+def test_products_are_listed_best_rated_first():
+    index = AlternativesIndex(max_per_category=3)
+    _add(index, "a", 50)
+    _add(index, "b", 70)
+    _add(index, "c", 60)
+
+    found = index.alternatives("x", ["en:spreads"], 40, limit=10)
+    assert _barcodes(found) == ["b", "c", "a"]
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 55, limit=10)) == ["b", "c"]
+    assert _barcodes(index.alternatives("b", ["en:spreads"], 0, limit=10)) == ["c", "a"]
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 0, limit=1)) == ["b"]
+
+
+def test_worst_product_is_evicted_beyond_the_list_size():
+    index = AlternativesIndex(max_per_category=2)
+    _add(index, "a", 50)
+    _add(index, "b", 70)
+    _add(index, "c", 60)
+    _add(index, "d", 10)
+
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 0, limit=10)) == ["b", "c"]
+    assert "a" not in index and "d" not in index
+    assert index.stats() == {
+        "products": 2, "categories": 1, "max_per_category": 2, "updates": 4, "evictions": 1,
+    }
+
+
+def test_readded_product_moves_up_with_a_higher_score():
+    index = AlternativesIndex(max_per_category=2)
+    _add(index, "a", 50)
+    _add(index, "b", 70)
+    _add(index, "a", 80)
+
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 0, limit=10)) == ["a", "b"]
+    assert index.stats()["products"] == 2
+    assert index.stats()["evictions"] == 0
+
+
+def test_readded_product_with_a_lower_score_does_not_restore_evicted_ones():
+    index = AlternativesIndex(max_per_category=2)
+    _add(index, "a", 50)
+    _add(index, "b", 70)
+    _add(index, "c", 60)
+    _add(index, "b", 10)
+
+    # "a" now outranks "b" but was forgotten when it was pushed out
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 0, limit=10)) == ["c", "b"]
+    assert "a" not in index
+    _add(index, "a", 50)
+    assert _barcodes(index.alternatives("x", ["en:spreads"], 0, limit=10)) == ["c", "a"]
+    assert "b" not in index
+
+
+def test_product_stays_indexed_while_listed_in_any_category():
+    index = AlternativesIndex(max_per_category=1)
+    _add(index, "p", 50, ["en:spreads", "en:chocolate-spreads"])
+    _add(index, "p", 50, ["en:spreads", "en:chocolate-spreads"])
+    _add(index, "q", 70, ["en:spreads"])
+
+    assert "p" in index
+    assert index._products["p"].listed == 1
+    _add(index, "r", 80, ["en:chocolate-spreads"])
+
+    assert "p" not in index
+    assert index.stats()["products"] == 2
+    assert index.stats()["evictions"] == 2
+
+
+def test_most_specific_category_is_searched_first_without_duplicates():
+    index = AlternativesIndex(max_per_category=5)
+    _add(index, "general", 90, ["en:spreads"])
+    _add(index, "both", 80, ["en:spreads", "en:chocolate-spreads"])
+    _add(index, "specific", 60, ["en:spreads", "en:chocolate-spreads"])
+
+    found = index.alternatives("x", ["en:spreads", "en:chocolate-spreads"], 50, limit=10)
+    assert [(product.barcode, category) for product, category in found] == [
+        ("both", "en:chocolate-spreads"),
+        ("specific", "en:chocolate-spreads"),
+        ("general", "en:spreads"),
+    ]
+
+
+def test_merge_keeps_products_indexed_since():
+    live = AlternativesIndex(max_per_category=5)
+    _add(live, "a", 80)
+    built = AlternativesIndex(max_per_category=5)
+    _add(built, "a", 10)
+    _add(built, "b", 60)
+
+    assert asyncio.run(live.merge(built)) == 1
+    found = live.alternatives("x", ["en:spreads"], 0, limit=10)
+    assert [(product.barcode, product.rating_score) for product, _ in found] == [("a", 80), ("b", 60)]
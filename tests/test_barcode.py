@@ -0,0 +1,48 @@
+import pytest
+
+from services.barcode import InvalidBarcode, canonical_or_raw, check_digit, normalize_barcode
+
+
+@pytest.mark.parametrize("code", ["3017620422003", "036000291452", "96385074", "10036000291459"])
+def test_check_digit_of_valid_codes(code):
+    assert check_digit(code[:-1]) == int(code[-1])
+
+
+@pytest.mark.parametrize("raw", ["3017620422004", "036000291453", "96385075", "10036000291450"])
+def test_wrong_check_digit_is_rejected(raw):
+    with pytest.raises(InvalidBarcode, match="check digit"):
+        normalize_barcode(raw)
+
+
+@pytest.mark.parametrize("raw", ["301762042200a", "３０１７６２０４２２００３", "1234567", "301762042200312"])
+def test_malformed_codes_are_rejected(raw):
+    with pytest.raises(InvalidBarcode):
+        normalize_barcode(raw)
+
+
+def test_ean13_is_kept_and_whitespace_removed():
+    assert normalize_barcode("3017620422003") == "3017620422003"
+    assert normalize_barcode(" 3017 6204 22003\n") == "3017620422003"
+
+
+def test_upc_a_becomes_ean13():
+    assert normalize_barcode("036000291452") == "0036000291452"
+
+
+def test_zero_padded_gtin14_becomes_ean13():
+    assert normalize_barcode("03017620422003") == "3017620422003"
+    assert normalize_barcode("00036000291452") == "0036000291452"
+
+
+def test_gtin14_with_packaging_indicator_is_kept():
+    assert normalize_barcode("10036000291459") == "10036000291459"
+
+
+@pytest.mark.parametrize("raw", ["12345670", "000012345670", "0000012345670", "00000012345670"])
+def test_padded_ean8_becomes_ean8(raw):
+    assert normalize_barcode(raw) == "12345670"
+
+
+def test_canonical_or_raw_keeps_invalid_codes():
+    assert canonical_or_raw("036000291452") == "0036000291452"
+    assert canonical_or_raw("not-a-code") == "not-a-code"
@@ -0,0 +1,48 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("numpy")
+
+from services.product_analysis_service import ProductAnalysisService
+
+GRADES = ["a", "b", "c", "d", "e", "A", "C", "E", "unknown", "not-applicable", ""]
+NOVA_GROUPS = [1, 2, 3, 4, 0, 5, -1]
+ADDITIVES_COUNTS = [0, 1, 7]
+
+
+def scalar(nutri_score, nova_group, eco_score, additives_count):
+    """Ratings of the per-product path, which lower-cases grades when reading a product"""
+    nutri_score, eco_score = nutri_score.lower(), eco_score.lower()
+    score, _, _ = ProductAnalysisService._calculate_product_rating(
+        nutri_score=nutri_score,
+        additives=["additive"] * additives_count,
+        nova_group=nova_group,
+        eco_score=eco_score,
+        product_name="",
+    )
+    return (
+        score,
+        ProductAnalysisService._determine_health_rating(nutri_score, 0, nova_group),
+        ProductAnalysisService._determine_environmental_rating(eco_score, 0),
+    )
+
+
+def test_analyze_products_matches_scalar_rules():
+    rows = list(itertools.product(GRADES, NOVA_GROUPS, GRADES, ADDITIVES_COUNTS))
+    columns = {
+        "nutri_score": [row[0] for row in rows],
+        "nova_group": [row[1] for row in rows],
+        "eco_score": [row[2] for row in rows],
+        "additives_count": [row[3] for row in rows],
+    }
+
+    result = ProductAnalysisService.analyze_products(columns)
+
+    actual = list(zip(
+        result["rating_score"].tolist(),
+        result["health_rating"].tolist(),
+        result["environmental_rating"].tolist(),
+    ))
+    assert actual == [scalar(*row) for row in rows]
@@ -0,0 +1,78 @@
+from services.cache import FRESH, MISS, STALE, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(clock, max_entries=10, max_bytes=1000, ttl=10.0, stale_ttl=5.0):
+    return TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, stale_ttl=stale_ttl, clock=clock)
+
+
+def test_entry_goes_from_fresh_to_stale_to_expired():
+    clock = FakeClock()
+    cache = _cache(clock)
+    cache.set("a", "value", 10)
+
+    assert cache.get("a") == ("value", FRESH)
+    clock.now = 10.0
+    assert cache.get("a") == ("value", STALE)
+    clock.now = 15.0
+    assert cache.get("a") == (None, MISS)
+    # Expired entries are kept as a last resort
+    assert cache.peek("a") == "value"
+    assert cache.get("b") == (None, MISS)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_least_recently_used_entry_is_evicted_by_count():
+    cache = _cache(FakeClock(), max_entries=2)
+    cache.set("a", 1, 10)
+    cache.set("b", 2, 10)
+    cache.get("a")
+    cache.set("c", 3, 10)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_by_bytes():
+    cache = _cache(FakeClock(), max_bytes=100)
+    cache.set("a", 1, 40)
+    cache.set("b", 2, 40)
+    cache.set("c", 3, 40)
+
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 80
+
+    cache.set("b", 2, 90)
+    assert len(cache) == 1 and "b" in cache
+    assert cache.stats()["bytes"] == 90
+
+
+def test_value_larger_than_the_budget_is_not_stored():
+    cache = _cache(FakeClock(), max_bytes=100)
+    cache.set("a", 1, 10)
+    cache.set("a", 2, 101)
+
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 0
+
+
+def test_peek_does_not_refresh_recency_or_counters():
+    cache = _cache(FakeClock(), max_entries=2)
+    cache.set("a", 1, 10)
+    cache.set("b", 2, 10)
+    assert cache.peek("a") == 1
+    cache.set("c", 3, 10)
+
+    assert "a" not in cache
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
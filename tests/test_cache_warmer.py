@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from fastapi import HTTPException
+
+from services import cache_warmer
+from services.cache_warmer import CacheWarmer, top_barcodes_from_log
+from services.upstream_scheduler import Priority
+
+LOG_LINES = [
+    '127.0.0.1:5000 - "GET /api/v1/products/5449000000996 HTTP/1.1" 200',
+    '127.0.0.1:5000 - "GET /api/v1/products/3017620422003 HTTP/1.1" 200',
+    '10.0.0.1 - - [16/Oct/2026:10:00:00 +0000] "GET /api/v1/products/03017620422003?x=1 HTTP/1.1" 200 512',
+    '127.0.0.1:5000 - "HEAD /api/v1/products/3017620422003 HTTP/1.1" 200',
+    '127.0.0.1:5000 - "GET /api/v1/products/40170725 HTTP/1.1" 404',
+    '127.0.0.1:5000 - "GET /api/v1/products/3017620422004 HTTP/1.1" 422',
+    '127.0.0.1:5000 - "GET /api/v1/products/not-a-code HTTP/1.1" 422',
+    '127.0.0.1:5000 - "GET /api/v1/products/5449000000996/alternatives HTTP/1.1" 200',
+    '127.0.0.1:5000 - "POST /api/v1/products/batch HTTP/1.1" 200',
+    '127.0.0.1:5000 - "GET /api/v1/stats HTTP/1.1" 200',
+    "garbage \xff without a request",
+    '"GET /api/v1/products/',
+    "",
+]
+
+
+@pytest.fixture(params=[".log", ".log.gz"])
+def access_log(request, tmp_path):
+    path = tmp_path / ("access" + request.param)
+    opener = gzip.open if request.param.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(LOG_LINES))
+    return str(path)
+
+
+def test_top_barcodes_are_canonical_and_most_requested_first(access_log):
+    assert top_barcodes_from_log(access_log, 10) == ["3017620422003", "5449000000996", "40170725"]
+
+
+def test_top_barcodes_are_limited(access_log):
+    assert top_barcodes_from_log(access_log, 1) == ["3017620422003"]
+
+
+class StubProductService:
+    """Product service recording its lookups and the peak number in flight"""
+
+    def __init__(self, missing=(), broken=()):
+        self.missing = set(missing)
+        self.broken = set(broken)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def get_product(self, barcode, priority=Priority.INTERACTIVE):
+        self.calls.append((barcode, priority))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if barcode in self.missing:
+            raise HTTPException(status_code=404, detail="not found")
+        if barcode in self.broken:
+            raise ValueError("malformed product document")
+
+
+@pytest.fixture
+def warmup_settings(monkeypatch, access_log):
+    monkeypatch.setattr(cache_warmer.settings, "WARMUP_BARCODES", ["96385074", "bad", "5449000000996"])
+    monkeypatch.setattr(cache_warmer.settings, "WARMUP_ACCESS_LOG", access_log)
+    monkeypatch.setattr(cache_warmer.settings, "WARMUP_TOP_N", 10)
+    monkeypatch.setattr(cache_warmer.settings, "WARMUP_RATE_PER_SECOND", 1000.0)
+    monkeypatch.setattr(cache_warmer.settings, "WARMUP_CONCURRENCY", 2)
+
+
+def test_hot_barcodes_put_configured_ones_first(warmup_settings):
+    assert CacheWarmer.hot_barcodes() == ["96385074", "5449000000996", "3017620422003", "40170725"]
+
+
+def test_warm_up_looks_up_hot_products_as_background_work(warmup_settings):
+    product_service = StubProductService(missing={"40170725"}, broken={"96385074"})
+    warmer = CacheWarmer(product_service, openfood_service=None)
+
+    asyncio.run(warmer._warm_up())
+
+    assert product_service.calls == [
+        ("96385074", Priority.BACKGROUND),
+        ("5449000000996", Priority.BACKGROUND),
+        ("3017620422003", Priority.BACKGROUND),
+        ("40170725", Priority.BACKGROUND),
+    ]
+    assert product_service.peak == 2
+    # Failed lookups do not stop the warm-up; only HTTP errors are counted
+    stats = warmer.stats()
+    assert (stats["warmup_done"], stats["warmed"], stats["warm_failures"]) == (True, 2, 1)
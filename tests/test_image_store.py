@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from services.image_store import ImageStore
+
+
+def _set_mtime(image, seconds):
+    os.utime(image.path, ns=(seconds * 10**9, seconds * 10**9))
+
+
+def test_least_recently_used_images_are_evicted_by_size(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=250)
+    first = store.put("aa01", b"1" * 100, "image/jpeg")
+    store.put("bb02", b"2" * 100, "image/png")
+    assert store.get("aa01") is first
+
+    store.put("cc03", b"3" * 100, "image/webp")
+
+    assert store.get("bb02") is None
+    assert not os.path.exists(os.path.join(tmp_path, "bb", "bb02.png"))
+    assert store.get("aa01") is first
+    stats = store.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 200, 1)
+
+
+def test_storing_a_key_again_replaces_its_file(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=1000)
+    old = store.put("aa01", b"1" * 100, "image/jpeg")
+    new = store.put("aa01", b"2" * 50, "image/png")
+
+    assert not os.path.exists(old.path)
+    assert store.get("aa01") is new
+    assert store.stats()["bytes"] == 50
+
+
+def test_unsupported_content_type_is_rejected(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=1000)
+
+    with pytest.raises(ValueError, match="Unsupported"):
+        store.put("aa01", b"<svg/>", "image/svg+xml")
+    assert store.stats()["entries"] == 0
+
+
+def test_link_keeps_the_content_readable_after_eviction(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=150)
+    image = store.put("aa01", b"1" * 100, "image/jpeg")
+    link = store.link(image)
+
+    store.put("bb02", b"2" * 100, "image/jpeg")
+
+    assert not os.path.exists(image.path)
+    with open(link, "rb") as f:
+        assert f.read() == b"1" * 100
+    with pytest.raises(FileNotFoundError):
+        store.link(image)
+
+
+def test_discard_removes_the_image_unless_stored_again(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=1000)
+    old = store.put("aa01", b"1" * 100, "image/jpeg")
+    new = store.put("aa01", b"2" * 100, "image/jpeg")
+
+    store.discard(old)
+    assert store.get("aa01") is new
+
+    store.discard(new)
+    assert store.get("aa01") is None
+    assert not os.path.exists(new.path)
+    assert store.stats()["bytes"] == 0
+
+
+def test_index_is_rebuilt_after_a_restart(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=1000)
+    newer = store.put("aa01", b"1" * 100, "image/jpeg")
+    older = store.put("bb02", b"2" * 100, "image/png")
+    _set_mtime(newer, 2_000_000)
+    _set_mtime(older, 1_000_000)
+    link = store.link(newer)
+    leftover = os.path.join(tmp_path, "aa", "interrupted.tmp")
+    open(leftover, "wb").close()
+
+    restarted = ImageStore(str(tmp_path), max_bytes=250)
+
+    assert not os.path.exists(link)
+    assert not os.path.exists(leftover)
+    assert restarted.stats()["bytes"] == 200
+    # Least recently written images are evicted first
+    restarted.put("cc03", b"3" * 100, "image/gif")
+    assert restarted.get("bb02") is None
+    assert restarted.get("aa01").content_type == "image/jpeg"
@@ -0,0 +1,25 @@
+import asyncio
+
+from services.local_store import LocalProductStore
+
+
+def test_backend_lookups_read_from_worker_threads(tmp_path):
+    path = str(tmp_path / "products.db")
+    writer = LocalProductStore(path)
+    writer.upsert_many([{"_id": "3017620422003", "product_name": "Nutella"}])
+    writer.close()
+
+    store = LocalProductStore(path, readonly=True)
+
+    async def scenario():
+        return await asyncio.gather(
+            store.get_product("3017620422003"),
+            store.get_product("0000000000000"),
+        )
+
+    found, missing = asyncio.run(scenario())
+    assert found["product"]["product_name"] == "Nutella"
+    assert missing is None
+    assert len(store._readers) >= 1
+    store.close()
+    assert store._readers == []
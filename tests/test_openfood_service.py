@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from fastapi import HTTPException
+
+from models.product_record import ProductRecord
+from services import metrics, openfood_service
+from services.cache import TTLCache
+from services.openfood_service import OpenFoodService
+from services.resilience import HALF_OPEN, CircuitBreaker
+from services.upstream_scheduler import Priority, SlotRequest, UpstreamScheduler
+
+
+def test_lookup_cancelled_while_queued_gives_back_half_open_slot():
+    async def scenario():
+        service = OpenFoodService(client=None)
+        service.breaker = CircuitBreaker(
+            window=10,
+            min_calls=1,
+            failure_rate_threshold=0.5,
+            slow_call_threshold=10.0,
+            open_seconds=0.0,
+            half_open_calls=1,
+        )
+        service.breaker.record(False, 0.0)
+        service.scheduler = UpstreamScheduler(
+            rate=0.001,
+            burst=1,
+            max_queue=10,
+            max_wait={Priority.INTERACTIVE: 60.0, Priority.BACKGROUND: 60.0},
+        )
+        assert service.scheduler.try_acquire(Priority.INTERACTIVE)
+
+        for _ in range(3):
+            task = asyncio.create_task(
+                service._fetch("3017620422003", SlotRequest(Priority.INTERACTIVE))
+            )
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return service.breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+class _SlowClient:
+    async def get(self, url, params=None):
+        await asyncio.sleep(0.01)
+        return httpx.Response(
+            200,
+            content=b'{"status": 1, "product": {"product_name": "Nutella"}}',
+            request=httpx.Request("GET", url),
+        )
+
+
+def test_every_caller_of_a_shared_lookup_reports_its_own_wait():
+    async def scenario():
+        service = OpenFoodService(client=_SlowClient())
+
+        async def lookup():
+            token = metrics.start_request()
+            await service.get_product("3017620422003")
+            return metrics.end_request(token)
+
+        return await asyncio.gather(lookup(), lookup())
+
+    for timings in asyncio.run(scenario()):
+        assert [name for name, _ in timings] == ["upstream"]
+        assert timings[0][1] >= 0.01
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FailingClient:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    async def get(self, url, params=None):
+        return httpx.Response(self.status_code, request=httpx.Request("GET", url))
+
+
+@pytest.mark.parametrize("status_code", [500, 503, 429])
+def test_expired_cached_copy_is_served_when_upstream_fails(monkeypatch, status_code):
+    monkeypatch.setattr(openfood_service.settings, "OPENFOOD_RETRY_MAX_ATTEMPTS", 1)
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, max_bytes=100_000, ttl=10.0, stale_ttl=5.0, clock=clock)
+    record = ProductRecord.from_product({"product_name": "Nutella"}, "3017620422003")
+    cache.set("3017620422003", record, record.size())
+    clock.now = 60.0
+    service = OpenFoodService(client=_FailingClient(status_code), cache=cache)
+
+    assert asyncio.run(service.get_product("3017620422003")) is record
+    assert service.fallbacks == 1
+
+
+def test_unknown_product_is_not_answered_from_an_expired_copy(monkeypatch):
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, max_bytes=100_000, ttl=10.0, stale_ttl=5.0, clock=clock)
+    record = ProductRecord.from_product({"product_name": "Nutella"}, "3017620422003")
+    cache.set("3017620422003", record, record.size())
+    clock.now = 60.0
+    service = OpenFoodService(client=_FailingClient(404), cache=cache)
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(service.get_product("3017620422003"))
+    assert e.value.status_code == 404
+    assert service.fallbacks == 0
+
+
+class _SlowFirstClient:
+    """Answers the first request after 0.5s and the others at once"""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def get(self, url, params=None):
+        self.requests += 1
+        if self.requests == 1:
+            await asyncio.sleep(0.5)
+        return httpx.Response(
+            200,
+            content=b'{"status": 1, "product": {"product_name": "Nutella"}}',
+            request=httpx.Request("GET", url),
+        )
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(openfood_service.settings, "OPENFOOD_HEDGE_ENABLED", True)
+    monkeypatch.setattr(openfood_service.settings, "OPENFOOD_HEDGE_DELAY", 0.01)
+
+
+def test_slow_request_is_hedged_and_the_faster_answer_wins(hedging):
+    client = _SlowFirstClient()
+    service = OpenFoodService(client=client)
+
+    record = asyncio.run(service.get_product("3017620422003"))
+
+    assert record.name == "Nutella"
+    assert client.requests == 2
+    assert (service.hedged, service.hedge_wins) == (1, 1)
+    assert service.retry_budget.stats()["withdrawn"] == 1
+
+
+def test_no_hedge_without_a_free_request_slot_keeps_the_budget(hedging):
+    client = _SlowFirstClient()
+    service = OpenFoodService(client=client)
+    service.scheduler = UpstreamScheduler(
+        rate=0.001,
+        burst=1,
+        max_queue=10,
+        max_wait={Priority.INTERACTIVE: 5.0, Priority.BACKGROUND: 5.0},
+    )
+
+    record = asyncio.run(service.get_product("3017620422003"))
+
+    assert record.name == "Nutella"
+    assert client.requests == 1
+    assert service.hedged == 0
+    assert service.retry_budget.stats()["withdrawn"] == 0
+    assert service.breaker.state == "closed"
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from models.product_record import ProductRecord
+from services import product_service
+from services.product_analysis_service import RULES_VERSION
+from services.product_service import ProductService
+
+NUTELLA = ProductRecord.from_product({
+    "_id": "3017620422003",
+    "product_name": "Nutella",
+    "last_modified_t": 1700000000,
+    "rev": 12,
+})
+
+
+def test_cache_key_and_etag_follow_the_response_version(monkeypatch):
+    service = ProductService(openfood_service=None, cache=ProductService.create_cache())
+    key = ProductService.cache_key(NUTELLA)
+    etag = ProductService.etag(NUTELLA)
+    analyzed = service.analyze(NUTELLA)
+    assert key[-1].startswith(RULES_VERSION)
+    assert analyzed.etag == etag
+    assert service.analyze(NUTELLA) is analyzed
+
+    monkeypatch.setattr(product_service, "_RESPONSE_VERSION", "changed-rules")
+
+    assert ProductService.cache_key(NUTELLA) != key
+    assert ProductService.etag(NUTELLA) != etag
+    reanalyzed = service.analyze(NUTELLA)
+    assert reanalyzed is not analyzed
+    assert reanalyzed.etag == ProductService.etag(NUTELLA)
+    assert service.cache.stats()["misses"] == 2
+
+
+def test_product_without_revision_is_not_cached():
+    service = ProductService(openfood_service=None, cache=ProductService.create_cache())
+    record = ProductRecord.from_product({"_id": "5449000000996", "product_name": "Coca-Cola"})
+
+    assert ProductService.cache_key(record) is None
+    assert service.analyze(record).etag == service.analyze(record).etag
+    assert service.cache.stats()["entries"] == 0
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from api.deps import get_product_service
+from api.v1.endpoints import products
+from config import get_settings
+from models.batch import BatchResponse
+from models.product_record import ProductRecord
+from services.barcode import InvalidBarcode, normalize_barcode
+from services.product_service import ProductService, _digest_etag
+from services.upstream_scheduler import Priority
+
+NUTELLA = ProductRecord.from_product({
+    "_id": "3017620422003",
+    "product_name": "Nutella",
+    "nutriscore_grade": "e",
+    "nova_group": 4,
+    "last_modified_t": 1700000000,
+    "rev": 12,
+}, "3017620422003")
+# No revision information: only the analyzed body identifies its response
+COLA = ProductRecord.from_product({
+    "_id": "5449000000996",
+    "product_name": "Coca-Cola",
+    "nutriscore_grade": "e",
+}, "5449000000996")
+BROKEN = "96385074"
+
+
+class StubOpenFoodService:
+    """Product source answering from a dict, like OpenFoodService.get_product"""
+
+    def __init__(self, records):
+        self.records = {record.barcode: record for record in records}
+        self.calls = []
+
+    async def get_product(self, barcode, priority=Priority.INTERACTIVE):
+        try:
+            barcode = normalize_barcode(barcode)
+        except InvalidBarcode as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        self.calls.append((barcode, priority))
+        if barcode == BROKEN:
+            raise ValueError("malformed product document")
+        record = self.records.get(barcode)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Product with barcode {barcode} not found")
+        return record
+
+
+@pytest.fixture
+def openfood():
+    return StubOpenFoodService([NUTELLA, COLA])
+
+
+@pytest.fixture
+def service(openfood):
+    return ProductService(openfood, cache=ProductService.create_cache())
+
+
+@pytest.fixture
+def client(service):
+    app = FastAPI()
+    app.include_router(products.router, prefix="/api/v1/products")
+    app.dependency_overrides[get_product_service] = lambda: service
+    with TestClient(app) as client:
+        yield client
+
+
+def test_batch_returns_one_item_per_requested_barcode(client, openfood):
+    barcodes = ["3017620422003", "03017620422003", "5449000000996", "3017620422003"]
+    response = client.post("/api/v1/products/batch", json={"barcodes": barcodes})
+
+    assert response.status_code == 200
+    items = response.json()["results"]
+    assert [item["barcode"] for item in items] == barcodes
+    assert [item["status_code"] for item in items] == [200] * 4
+    assert items[0]["result"] == items[1]["result"] == items[3]["result"]
+    assert items[2]["result"]["analysis"]["name"] == "Coca-Cola"
+    # Spellings of one product share a lookup, scheduled as background work
+    assert openfood.calls == [
+        ("3017620422003", Priority.BACKGROUND),
+        ("5449000000996", Priority.BACKGROUND),
+    ]
+
+
+def test_batch_reports_failed_lookups_in_their_own_items(client):
+    barcodes = ["123", "3017620422004", "40170725", BROKEN, "3017620422003"]
+    response = client.post("/api/v1/products/batch", json={"barcodes": barcodes})
+
+    assert response.status_code == 200
+    items = response.json()["results"]
+    assert [item["status_code"] for item in items] == [422, 422, 404, 500, 200]
+    assert all(item["result"] is None and item["error"] for item in items[:4])
+    assert items[3]["error"] == "Internal server error"
+
+
+def test_batch_body_matches_the_response_model(client):
+    barcodes = ["5449000000996", "40170725", "3017620422003"]
+    response = client.post("/api/v1/products/batch", json={"barcodes": barcodes})
+
+    parsed = BatchResponse.model_validate_json(response.content)
+    assert parsed.results[0].result == ProductService.build_response(COLA)
+    assert parsed.results[2].result == ProductService.build_response(NUTELLA)
+    assert json.loads(response.content) == json.loads(parsed.model_dump_json())
+
+
+def test_batch_rejects_too_many_barcodes(client, openfood):
+    barcodes = ["3017620422003"] * (get_settings().BATCH_MAX_BARCODES + 1)
+    response = client.post("/api/v1/products/batch", json={"barcodes": barcodes})
+
+    assert response.status_code == 422
+    assert openfood.calls == []
+
+
+def test_product_response_carries_validators(client):
+    response = client.get("/api/v1/products/3017620422003")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == ProductService.etag(NUTELLA)
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert response.json()["analysis"]["name"] == "Nutella"
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", 'W/{etag}', '"other", {etag}', "*"])
+def test_matching_if_none_match_gets_an_empty_304(client, service, if_none_match):
+    etag = client.get("/api/v1/products/3017620422003").headers["etag"]
+    response = client.get(
+        "/api/v1/products/3017620422003", headers={"If-None-Match": if_none_match.format(etag=etag)}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # Answered from the revision, before the analysis cache is consulted
+    assert service.cache.stats()["hits"] == 0
+
+
+def test_mismatching_if_none_match_gets_the_product(client):
+    response = client.get("/api/v1/products/3017620422003", headers={"If-None-Match": '"other"'})
+
+    assert response.status_code == 200
+    assert response.json()["analysis"]["name"] == "Nutella"
+
+
+def test_new_revision_gets_a_new_etag(client, openfood):
+    etag = client.get("/api/v1/products/3017620422003").headers["etag"]
+    openfood.records["3017620422003"] = ProductRecord.from_product({
+        "_id": "3017620422003",
+        "product_name": "Nutella",
+        "last_modified_t": 1700000100,
+        "rev": 13,
+    })
+    response = client.get("/api/v1/products/3017620422003", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_product_without_revision_is_identified_by_its_body(client):
+    response = client.get("/api/v1/products/5449000000996")
+    etag = response.headers["etag"]
+
+    assert ProductService.etag(COLA) is None
+    assert etag == _digest_etag(response.content)
+    revalidated = client.get("/api/v1/products/5449000000996", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+
+
+class GatedProductService:
+    """ProductService whose lookups wait until their barcode is released"""
+
+    def __init__(self, service):
+        self.service = service
+        self.gates = {}
+        self.started = []
+        self.cancelled = []
+
+    def release(self, barcode):
+        self.gates.setdefault(barcode, asyncio.Event()).set()
+
+    async def get_product(self, barcode, priority=Priority.INTERACTIVE):
+        self.started.append(barcode)
+        try:
+            await self.gates.setdefault(barcode, asyncio.Event()).wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(barcode)
+            raise
+        return await self.service.get_product(barcode, priority)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def gated(service):
+    return GatedProductService(service)
+
+
+@pytest.fixture
+def ws_client(gated):
+    app = FastAPI()
+    app.include_router(products.router, prefix="/api/v1/products")
+    app.dependency_overrides[get_product_service] = lambda: gated
+    with TestClient(app) as client:
+        yield client
+
+
+def test_scan_session_replies_as_lookups_finish(ws_client, gated):
+    with ws_client.websocket_connect("/api/v1/products/ws") as ws:
+        ws.send_text("3017620422003")
+        ws.send_text(" 5449000000996\n")
+        wait_until(lambda: len(gated.started) == 2)
+
+        ws_client.portal.call(gated.release, "5449000000996")
+        first = ws.receive_json()
+        ws_client.portal.call(gated.release, "3017620422003")
+        second = ws.receive_json()
+
+    assert (first["barcode"], first["status_code"]) == ("5449000000996", 200)
+    assert first["result"]["analysis"]["name"] == "Coca-Cola"
+    assert (second["barcode"], second["status_code"]) == ("3017620422003", 200)
+    assert second["result"] == ProductService.build_response(NUTELLA).model_dump(mode="json")
+
+
+def test_scan_session_reports_failed_lookups(ws_client, gated):
+    with ws_client.websocket_connect("/api/v1/products/ws") as ws:
+        for barcode in ["40170725", BROKEN]:
+            ws_client.portal.call(gated.release, barcode)
+            ws.send_text(barcode)
+            item = ws.receive_json()
+            assert item["barcode"] == barcode and item["result"] is None
+            assert item["status_code"] == (404 if barcode == "40170725" else 500)
+
+
+def test_scan_session_rejects_binary_frames(ws_client, gated):
+    with ws_client.websocket_connect("/api/v1/products/ws") as ws:
+        ws.send_bytes(b"3017620422003")
+        item = ws.receive_json()
+
+    assert item == {
+        "barcode": "",
+        "status_code": 400,
+        "result": None,
+        "error": "Barcodes must be sent as text frames",
+    }
+    assert gated.started == []
+
+
+def test_scan_session_stops_reading_at_max_pending(monkeypatch, ws_client, gated):
+    monkeypatch.setattr(products.settings, "WS_SESSION_MAX_PENDING", 2)
+    with ws_client.websocket_connect("/api/v1/products/ws") as ws:
+        for barcode in ["3017620422003", "5449000000996", "40170725"]:
+            ws.send_text(barcode)
+        wait_until(lambda: len(gated.started) == 2)
+        time.sleep(0.05)
+        # The third scan stays unread on the socket
+        assert gated.started == ["3017620422003", "5449000000996"]
+
+        ws_client.portal.call(gated.release, "5449000000996")
+        assert ws.receive_json()["barcode"] == "5449000000996"
+        wait_until(lambda: len(gated.started) == 3)
+        assert gated.started[2] == "40170725"
+
+        ws_client.portal.call(gated.release, "40170725")
+        assert ws.receive_json()["status_code"] == 404
+        ws_client.portal.call(gated.release, "3017620422003")
+        assert ws.receive_json()["barcode"] == "3017620422003"
+
+
+def test_disconnect_cancels_pending_lookups(ws_client, gated):
+    with ws_client.websocket_connect("/api/v1/products/ws") as ws:
+        ws.send_text("3017620422003")
+        ws.send_text("5449000000996")
+        wait_until(lambda: len(gated.started) == 2)
+        ws.close()
+
+    wait_until(lambda: len(gated.cancelled) == 2)
+    assert sorted(gated.cancelled) == ["3017620422003", "5449000000996"]
@@ -0,0 +1,41 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from services.product_analysis_service import ProductAnalysisService, _RATING_TABLE
+
+GRADES = ["a", "b", "c", "d", "e", "unknown", "not-applicable", ""]
+NOVA_GROUPS = [0, 1, 2, 3, 4, 5, -1]
+ADDITIVES = [[], ["en:e322"], ["en:e322", "en:e471"], ["en:e%d" % i for i in range(12)]]
+NAMES = ["", "Nutella", "Сок 'Добрый' {апельсин}", "100% {name} %s \\n"]
+
+
+def reference(nutri_score, nova_group, eco_score, additives, product_name):
+    """Ratings as computed by the reference scoring rules"""
+    score, details, description = ProductAnalysisService._calculate_product_rating(
+        nutri_score=nutri_score,
+        additives=additives,
+        nova_group=nova_group,
+        eco_score=eco_score,
+        product_name=product_name
+    )
+    health = ProductAnalysisService._determine_health_rating(nutri_score, 0, nova_group)
+    environmental = ProductAnalysisService._determine_environmental_rating(eco_score, 0)
+    return score, details, description, health, environmental
+
+
+def from_table(nutri_score, nova_group, eco_score, additives, product_name):
+    rule = _RATING_TABLE[ProductAnalysisService._rating_index(
+        nutri_score, nova_group, eco_score, bool(additives)
+    )]
+    description = rule.describe(product_name, len(additives))
+    return rule.score, rule.details, description, rule.health_rating, rule.environmental_rating
+
+
+def test_rating_table_matches_reference_rules_for_every_input():
+    combinations = list(itertools.product(GRADES, NOVA_GROUPS, GRADES, ADDITIVES, NAMES))
+    assert len(combinations) == 7168
+    for combination in combinations:
+        assert from_table(*combination) == reference(*combination), combination
@@ -0,0 +1,140 @@
+from services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock, half_open_calls=2):
+    return CircuitBreaker(
+        window=4,
+        min_calls=4,
+        failure_rate_threshold=0.5,
+        slow_call_threshold=1.0,
+        open_seconds=10.0,
+        half_open_calls=half_open_calls,
+        clock=clock,
+    )
+
+
+def _open(breaker):
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record(False, 0.1, breaker.generation)
+    assert breaker.state == OPEN
+
+
+def test_breaker_opens_once_enough_calls_are_bad():
+    breaker = _breaker(FakeClock())
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record(True, 5.0)  # slow calls are bad too
+    assert breaker.state == OPEN
+
+    assert not breaker.allow_request()
+    stats = breaker.stats()
+    assert (stats["opened"], stats["rejected"], stats["slow_calls"], stats["failed_calls"]) == (1, 1, 1, 1)
+
+
+def test_breaker_closes_after_successful_trial_calls():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = 10.0
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    generation = breaker.generation
+    breaker.record(True, 0.1, generation)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0.1, generation)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_failed_trial_call_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = 10.0
+
+    assert breaker.allow_request()
+    breaker.record(False, 0.1, breaker.generation)
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_calls_from_before_half_open_are_not_trial_results():
+    clock = FakeClock()
+    breaker = _breaker(clock, half_open_calls=1)
+    assert breaker.allow_request()
+    stale = breaker.generation
+    _open(breaker)
+    clock.now = 10.0
+
+    assert breaker.allow_request()
+    # The call allowed while closed neither closes nor reopens the breaker
+    breaker.record(True, 0.1, stale)
+    assert breaker.state == HALF_OPEN
+    breaker.record(False, 0.1, stale)
+    assert breaker.state == HALF_OPEN
+    # nor gives back the slot of the admitted trial call
+    breaker.release(stale)
+    assert not breaker.allow_request()
+
+    breaker.record(True, 0.1, breaker.generation)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_trial_call_gives_its_slot_back():
+    clock = FakeClock()
+    breaker = _breaker(clock, half_open_calls=1)
+    _open(breaker)
+    clock.now = 10.0
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release(breaker.generation)
+    assert breaker.allow_request()
+
+
+def test_retry_budget_is_bounded_by_the_request_rate():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0.1, capacity=2.0, clock=clock)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+    clock.now = 10.0
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    assert budget.stats() == {"tokens": 0.0, "withdrawn": 4, "exhausted": 3}
+
+
+def test_refunded_token_can_be_withdrawn_again():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, capacity=1.0, clock=FakeClock())
+    assert budget.withdraw()
+    budget.refund()
+    assert budget.withdraw()
+    assert budget.stats()["withdrawn"] == 1
+
+
+def test_retry_budget_is_capped():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=1.0, min_per_second=100.0, capacity=2.0, clock=clock)
+    clock.now = 60.0
+    budget.deposit()
+    assert budget.stats()["tokens"] == 2.0
@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from api.responses import etag_matches
+
+
+@pytest.mark.parametrize("if_none_match", ['"abc"', 'W/"abc"', '"x", "abc"', '"x",W/"abc" ', " * "])
+def test_etag_matches(if_none_match):
+    assert etag_matches(if_none_match, '"abc"')
+
+
+@pytest.mark.parametrize("if_none_match", [None, "", '"abcd"', '"x", "y"', "abc"])
+def test_etag_does_not_match(if_none_match):
+    assert not etag_matches(if_none_match, '"abc"')
+
+
+def test_weak_etag_matches_its_strong_form():
+    assert etag_matches('"abc"', 'W/"abc"')
@@ -0,0 +1,74 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "product"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["product"] * 5
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_caller_after_last_waiter_left_starts_a_new_call():
+    async def scenario():
+        flight = SingleFlight()
+        started = 0
+
+        async def fetch():
+            nonlocal started
+            started += 1
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                # Unwind slowly, so the next caller arrives before the task is done
+                await asyncio.sleep(0.05)
+                raise
+            return "stale"
+
+        async def fast():
+            return "fresh"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("key", fetch, timeout=0.01)
+        result = await flight.do("key", fast)
+        return started, result
+
+    started, result = asyncio.run(scenario())
+    assert started == 1
+    assert result == "fresh"
+
+
+def test_shared_call_does_not_run_in_the_first_callers_context():
+    caller = contextvars.ContextVar("caller", default=None)
+
+    async def scenario():
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return caller.get()
+
+        async def call(name):
+            caller.set(name)
+            return await flight.do("key", fetch)
+
+        flight = SingleFlight()
+        return await asyncio.gather(call("first"), call("second"))
+
+    assert asyncio.run(scenario()) == [None, None]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from services.upstream_scheduler import Priority, SchedulerRejected, SlotRequest, UpstreamScheduler
+
+
+def _scheduler() -> UpstreamScheduler:
+    return UpstreamScheduler(
+        rate=50.0,
+        burst=1,
+        max_queue=100,
+        max_wait={Priority.INTERACTIVE: 5.0, Priority.BACKGROUND: 5.0},
+    )
+
+
+def test_promoted_request_is_granted_before_background_requests():
+    async def scenario():
+        scheduler = _scheduler()
+        await scheduler.acquire(Priority.BACKGROUND)
+        order = []
+
+        async def wait(name, request):
+            await scheduler.acquire(request=request)
+            order.append(name)
+
+        requests = [SlotRequest(Priority.BACKGROUND) for _ in range(3)]
+        tasks = [asyncio.create_task(wait(i, request)) for i, request in enumerate(requests)]
+        await asyncio.sleep(0)
+        scheduler.promote(requests[2], Priority.INTERACTIVE)
+        await asyncio.gather(*tasks)
+        return order, scheduler.stats()["classes"]
+
+    order, classes = asyncio.run(scenario())
+    assert order == [2, 0, 1]
+    assert classes["interactive"]["granted"] == 1
+    assert classes["background"]["granted"] == 3
+    assert classes["interactive"]["queued"] == classes["background"]["queued"] == 0
+
+
+def test_promote_never_lowers_priority():
+    request = SlotRequest(Priority.INTERACTIVE)
+    _scheduler().promote(request, Priority.BACKGROUND)
+    assert request.priority == Priority.INTERACTIVE
+
+
+def test_token_granted_to_a_cancelled_request_is_given_back():
+    async def scenario():
+        scheduler = UpstreamScheduler(
+            rate=20.0,
+            burst=1,
+            max_queue=10,
+            max_wait={Priority.INTERACTIVE: 5.0, Priority.BACKGROUND: 5.0},
+        )
+        await scheduler.acquire()
+        request = SlotRequest(Priority.INTERACTIVE)
+        task = asyncio.create_task(scheduler.acquire(request=request))
+        await asyncio.sleep(0)
+        granted = request._entry[2]
+        while not granted.done():
+            await asyncio.sleep(0)
+        # The grant is settled but the waiter has not resumed yet
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return scheduler.try_acquire(Priority.INTERACTIVE)
+
+    assert asyncio.run(scenario())
+
+
+def test_request_waiting_longer_than_its_class_maximum_is_rejected():
+    async def scenario():
+        scheduler = UpstreamScheduler(
+            rate=0.001,
+            burst=1,
+            max_queue=10,
+            max_wait={Priority.INTERACTIVE: 0.01, Priority.BACKGROUND: 5.0},
+        )
+        await scheduler.acquire()
+        with pytest.raises(SchedulerRejected, match="Timed out"):
+            await scheduler.acquire(Priority.INTERACTIVE)
+        await scheduler.aclose()
+        return scheduler.stats()["classes"]["interactive"]
+
+    classes = asyncio.run(scenario())
+    assert classes["timeouts"] == 1
+    assert classes["queued"] == 0
+
+
+def test_aclose_rejects_queued_requests_and_stops_the_dispatcher():
+    async def scenario():
+        scheduler = UpstreamScheduler(
+            rate=0.001,
+            burst=1,
+            max_queue=10,
+            max_wait={Priority.INTERACTIVE: 60.0, Priority.BACKGROUND: 60.0},
+        )
+        await scheduler.acquire()
+        task = asyncio.create_task(scheduler.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        dispatcher = scheduler._dispatcher
+        await scheduler.aclose()
+        with pytest.raises(SchedulerRejected, match="closed"):
+            await task
+        return dispatcher
+
+    assert asyncio.run(scenario()).done()